@@ -0,0 +1,155 @@
+"""
+Command-line batch dose calculator
+Streams CSV or NDJSON rows with mushroom_type, dose_level, strain and
+weight_kg columns through calculate_dose across a process pool, writing
+results in input order in constant memory. An NDJSON line that is not a
+JSON object is answered with its text under invalid_line and an error
+
+    python batch.py doses.csv > results.csv
+    cat doses.ndjson | python batch.py - --format ndjson --workers 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from shroomies import calculate_dose
+
+RESULT_FIELDS = ['dose_grams', 'weight_unit', 'potency_category', 'strain_found',
+                 'normalized_strain', 'weight_factor', 'match_confidence', 'error']
+
+# NDJSON output field holding an input line that is not a JSON object
+INVALID_LINE_FIELD = 'invalid_line'
+
+
+class InvalidRow(dict):
+    """NDJSON input line that is not a JSON object, as {INVALID_LINE_FIELD: line}"""
+
+
+def calculate_row(row):
+    """
+    Calculate the dose for one input row
+    Returns the result fields, with 'error' set instead for bad rows
+    """
+    if isinstance(row, InvalidRow):
+        return {'error': 'Invalid JSON row'}
+    try:
+        result = calculate_dose(
+            row['mushroom_type'],
+            row['dose_level'],
+            row.get('strain'),
+            float(row['weight_kg'])
+        ).as_dict()
+    except KeyError as e:
+        return {'error': f"Missing or unknown value: {e.args[0]}"}
+    except (TypeError, ValueError, AttributeError) as e:
+        return {'error': str(e)}
+    result['error'] = None
+    return result
+
+
+def calculate_chunk(rows):
+    """Calculate a chunk of rows in a worker process"""
+    return [calculate_row(row) for row in rows]
+
+
+def read_rows(stream, input_format):
+    """Yield input rows as dicts"""
+    if input_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else InvalidRow({INVALID_LINE_FIELD: line.rstrip('\n')})
+
+
+def chunked(rows, size):
+    """Yield lists of up to size rows"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def process_chunks(chunks, workers):
+    """
+    Yield (rows, results) per chunk in input order
+    At most two chunks per worker are in flight, so memory stays bounded
+    however large the input is
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, calculate_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(calculate_chunk, chunk)))
+            if len(pending) >= workers * 2:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Calculate doses for a CSV or NDJSON file')
+    parser.add_argument('input', help="Input file, or - for stdin")
+    parser.add_argument('--output', '-o', help='Output file (default stdout)')
+    parser.add_argument('--format', choices=['csv', 'ndjson'],
+                        help='Input and output format (default from the file extension, else csv)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: all cores; 1 runs in-process)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per worker task')
+    args = parser.parse_args(argv)
+
+    input_format = args.format
+    if input_format is None:
+        input_format = 'ndjson' if args.input.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    output = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+
+    rows = errors = 0
+    start = time.perf_counter()
+    try:
+        writer = None
+        for chunk, results in process_chunks(chunked(read_rows(source, input_format), args.chunk_size), args.workers):
+            for row, result in zip(chunk, results):
+                rows += 1
+                errors += result.get('error') is not None
+                if input_format == 'csv':
+                    if writer is None:
+                        writer = csv.DictWriter(output, fieldnames=[*row, *RESULT_FIELDS], extrasaction='ignore')
+                        writer.writeheader()
+                    writer.writerow({**row, **result})
+                else:
+                    output.write(json.dumps({**row, **result}, separators=(',', ':')) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed else 0.0
+    print(f'{rows} rows, {errors} errors in {elapsed:.2f}s ({rate:,.0f} rows/s)', file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
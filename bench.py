@@ -0,0 +1,234 @@
+"""
+Performance benchmarks for the dose calculator
+Times the shroomies engine functions, calculate_doses per row over a
+random cohort, fuzzy strain matching over growing synthetic catalogues
+and full Streamlit reruns of app.main, writes the
+results to a JSON file and optionally compares them against a previous run
+to flag regressions
+
+    python bench.py --output bench.json
+    python bench.py --output new.json --compare bench.json --threshold 0.1
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+
+import shroomies
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+# Strain inputs exercising each resolution path
+STRAIN_CASES = {
+    'hit': 'Golden Teacher',
+    'miss': 'unlisted strain',
+    'alias': 'PE',
+    'category': 'strong',
+    'fuzzy': 'golden teachr'
+}
+
+# Catalogue sizes and misspelled or unknown inputs for the fuzzy matching
+# scaling benchmark
+SCALING_SIZES = (10000, 100000, 300000)
+SCALING_CASES = {
+    'misspelled': 'golden teachr',
+    'long': 'albino penis envi',
+    'unknown': 'zzqx vorpal'
+}
+
+# Rows in the calculate_doses cohort benchmark
+COHORT_ROWS = 100000
+
+WEIGHT_CASES = {
+    'low': 60.0,
+    'ramp': 100.0,
+    'flat': 150.0,
+    'high': 300.0
+}
+
+
+def time_call(func, repeat=5):
+    """Best-of-repeat time per call in nanoseconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def engine_benchmarks():
+    """Benchmarks of the public shroomies functions"""
+    results = {}
+    for case, strain in STRAIN_CASES.items():
+        results[f'calculate_dose[{case}]'] = time_call(
+            lambda: shroomies.calculate_dose('dried', 'normal', strain, 90.0)
+        )
+        results[f'get_strain_potency[{case}]'] = time_call(lambda: shroomies.get_strain_potency(strain))
+        results[f'normalize_strain_name[{case}]'] = time_call(lambda: shroomies.normalize_strain_name(strain))
+    for case, weight in WEIGHT_CASES.items():
+        results[f'get_weight_factor[{case}]'] = time_call(lambda: shroomies.get_weight_factor(weight))
+    for prefix in ('g', 'golden t', 'zz'):
+        results[f'complete_strain[{prefix}]'] = time_call(lambda: shroomies.complete_strain(prefix))
+    results['get_available_strains'] = time_call(shroomies.get_available_strains)
+    return results
+
+
+def cohort_benchmarks(rows=COHORT_ROWS, seed=0):
+    """
+    calculate_doses time per row over a random cohort of forms, dose levels,
+    strain inputs and weights, given as NumPy arrays and as lists
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    table = shroomies.get_strain_table()
+    strains = [*table.strain_names, *table.aliases, *table.potency_categories, *STRAIN_CASES.values()]
+    arrays = (
+        np.array(shroomies.MUSHROOM_TYPES)[rng.integers(0, len(shroomies.MUSHROOM_TYPES), rows)],
+        np.array(list(shroomies.DOSE_LEVELS))[rng.integers(0, len(shroomies.DOSE_LEVELS), rows)],
+        np.array(strains)[rng.integers(0, len(strains), rows)],
+        rng.uniform(40.0, 200.0, rows).round(1)
+    )
+    lists = tuple(column.tolist() for column in arrays)
+    return {
+        f'calculate_doses[{case},per_row]': time_call(lambda: shroomies.calculate_doses(*columns)) / rows
+        for case, columns in (('arrays', arrays), ('lists', lists))
+    }
+
+
+def synthetic_strain_table(size, seed=0):
+    """
+    Compact strain table of size names built from a syllable vocabulary,
+    plus the built-in strains, so trigram frequencies are skewed like a
+    real catalogue's rather than uniform
+    """
+    rng = random.Random(seed)
+    syllables = ['ba', 'ca', 'do', 'el', 'fi', 'go', 'ha', 'in', 'ka', 'lo', 'ma', 'ne', 'or', 'pi',
+                 'ra', 'si', 'ta', 'un', 'vo', 'wa', 'xi', 'yo', 'za', 'en', 'an', 'us']
+    vocabulary = sorted({''.join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(size // 10 + 100)})
+    strains = dict(shroomies.STRAIN_POTENCIES)
+    while len(strains) < size:
+        name = ' '.join(rng.choices(vocabulary, k=rng.randint(1, 3)))
+        strains.setdefault(name, round(rng.uniform(4.0, 12.0), 1))
+    return shroomies.StrainTable(
+        shroomies.CompactStrainStore.from_items(strains.items()),
+        shroomies.POTENCY_CATEGORIES,
+        shroomies.STRAIN_ALIASES
+    )
+
+
+def scaling_benchmarks(sizes=SCALING_SIZES):
+    """
+    Benchmarks of resolving misspelled and unknown strains as the strain
+    catalogue grows, which go through fuzzy matching
+    """
+    results = {}
+    builtin = shroomies.get_strain_table()
+    try:
+        for size in sizes:
+            table = synthetic_strain_table(size)
+            table.fuzzy_index
+            table.completion_index
+            shroomies.set_strain_table(table)
+            # A synthetic name missing its first letter, whose trigrams are all common
+            cases = {**SCALING_CASES, 'synthetic': table.strain_names[size // 2][1:]}
+            for case, strain in cases.items():
+                results[f'resolve_strain[{case},{size}]'] = time_call(lambda: shroomies.resolve_strain(strain))
+    finally:
+        shroomies.set_strain_table(builtin)
+    return results
+
+
+def _calculate_button(at):
+    return next(b for b in at.button if b.label.startswith('🧮'))
+
+
+def app_benchmarks(repeat=5):
+    """
+    Benchmarks of full app.main script runs through Streamlit's AppTest
+    Each case times a Calculate click for one language and strain input mode
+    """
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    for language in ('en', 'es'):
+        for strain_method in ('general_potency', 'specific_strain'):
+            at = AppTest.from_file(APP_PATH, default_timeout=30).run()
+            at.sidebar.selectbox[0].set_value(language).run()
+            at.radio[0].set_value(strain_method).run()
+            if strain_method == 'specific_strain':
+                at.text_input[0].input(STRAIN_CASES['hit']).run()
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                _calculate_button(at).click().run()
+                timings.append(time.perf_counter() - start)
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+            results[f'app.main[{language},{strain_method}]'] = min(timings) * 1e9
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline run
+    Returns a list of (name, baseline ns, current ns, relative change)
+    for benchmarks slower than the baseline by more than threshold
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous:
+            change = (current - previous) / previous
+            if change > threshold:
+                regressions.append((name, previous, current, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the dose calculator')
+    parser.add_argument('--output', default='bench.json', help='JSON file to write results to')
+    parser.add_argument('--compare', help='Baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown that counts as a regression (default 0.1)')
+    parser.add_argument('--skip-app', action='store_true', help='Skip the app rerun benchmarks')
+    parser.add_argument('--skip-scaling', action='store_true',
+                        help='Skip the fuzzy matching benchmarks over large synthetic catalogues')
+    args = parser.parse_args(argv)
+
+    results = engine_benchmarks()
+    results.update(cohort_benchmarks())
+    if not args.skip_scaling:
+        results.update(scaling_benchmarks())
+    if not args.skip_app:
+        results.update(app_benchmarks())
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'platform': platform.platform()
+            },
+            'results_ns': results
+        }, f, indent=2)
+
+    for name, ns in results.items():
+        print(f'{name:45} {ns:14,.0f} ns')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results_ns']
+        regressions = compare(results, baseline, args.threshold)
+        for name, previous, current, change in regressions:
+            print(f'REGRESSION {name}: {previous:,.0f} ns -> {current:,.0f} ns (+{change:.0%})')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
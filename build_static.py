@@ -0,0 +1,241 @@
+"""
+Build the static data asset used by index.html
+Exports the shroomies engine tables (and optionally a precomputed dose
+grid) to a minified JSON file so the standalone page computes the same
+doses as the Python engine without a server. Checks that the engine's
+fixed-point kernel agrees with the float formula, and stamps sw.js with the
+files it precaches and a cache version, so a new asset or page replaces
+the offline copy browsers keep
+
+    python build_static.py
+    python build_static.py --grid-step 5 --max-bytes 262144
+    python build_static.py --check
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+from shroomies import (
+    DOSE_LEVELS,
+    FIXED_DOSE_LEVELS_MG,
+    FIXED_FORM_RATIOS,
+    FIXED_WEIGHT_SEGMENTS,
+    MUSHROOM_TYPES,
+    WEIGHT_UNITS,
+    calculate_doses,
+    float_dose,
+    get_strain_table,
+    kg_to_pounds,
+    milli,
+    pounds_to_kg
+)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(ROOT, 'shroomies-data.json')
+SERVICE_WORKER = os.path.join(ROOT, 'sw.js')
+
+# Files the service worker precaches besides the data asset, relative to
+# the page; './' is the page as reached through its directory URL
+OFFLINE_FILES = ('./', 'index.html', 'manifest.webmanifest', 'icon.svg')
+
+# References to other files in the page
+_PAGE_REFERENCE = re.compile(r'(?:href|src)="([^"]+)"|fetch\("([^"]+)"\)')
+
+# Size budget for the generated asset in bytes
+DEFAULT_MAX_BYTES = 16 * 1024
+
+# Weight range covered by the optional dose grid
+GRID_MIN_KG = 40
+GRID_MAX_KG = 200
+
+# Weight range of the fixed-point equivalence check, covering the app's
+# inputs and both ends of the weight curve
+EQUIVALENCE_MIN_KG = 20
+EQUIVALENCE_MAX_KG = 400
+
+# How far past a rounding tie the float dose may be when the fixed-point
+# dose rounds the other way, in centigrams
+EQUIVALENCE_SLACK_CG = 0.1
+
+
+def build_tables():
+    """
+    Collect the integer tables the page's fixed-point kernel needs
+    These are the tables calculate_dose uses, so both compute identical
+    doses: potencies in thousandths, dose levels in milligrams, form
+    ratios as [numerator, denominator] and the weight curve segments
+    """
+    table = get_strain_table()
+    return {
+        'strains': {name: milli(table.strain_potencies[name]) for name in table.strain_names},
+        'aliases': dict(sorted(table.aliases.items())),
+        'categories': {name: milli(potency) for name, potency in table.potency_categories.items()},
+        'doseLevels': dict(FIXED_DOSE_LEVELS_MG),
+        'units': dict(zip(MUSHROOM_TYPES, WEIGHT_UNITS)),
+        'forms': dict(zip(MUSHROOM_TYPES, map(list, FIXED_FORM_RATIOS))),
+        'weightSegments': [list(segment) for segment in FIXED_WEIGHT_SEGMENTS]
+    }
+
+
+def build_grid(tables, step):
+    """
+    Precompute doses in centigrams for every form, level and strain at
+    weights from GRID_MIN_KG to GRID_MAX_KG in step kg increments
+    Doses are flattened in form, level, strain, weight order
+    """
+    import numpy as np
+
+    weights = list(range(GRID_MIN_KG, GRID_MAX_KG + 1, step))
+    strains = [*tables['categories'], *tables['strains']]
+    forms, levels, names, kgs = np.meshgrid(
+        np.array(MUSHROOM_TYPES), np.array(list(DOSE_LEVELS)), np.array(strains), np.array(weights, dtype=float),
+        indexing='ij'
+    )
+    doses = calculate_doses(forms.ravel(), levels.ravel(), names.ravel(), kgs.ravel())['dose_grams']
+    return {
+        'weights': weights,
+        'strains': strains,
+        'doses': np.rint(doses * 100).astype(int).tolist()
+    }
+
+
+def check_fixed_point():
+    """
+    Compare the fixed-point kernel with the float formula over the input grid
+    Every form and dose level, one strain per distinct potency, and the
+    weights the app accepts in kg and lbs steps. Each fixed-point dose must
+    be the float dose rounded to 0.01, give or take EQUIVALENCE_SLACK_CG
+    centigrams of float error and whole-gram weight rounding at ties
+    Returns (rows, rows rounded differently, worst distance past a tie in
+    centigrams)
+    """
+    import numpy as np
+
+    table = get_strain_table()
+    by_potency = {}
+    for name, potency in [*table.potency_categories.items(), *table.strain_potencies.items()]:
+        by_potency.setdefault(potency, name)
+    weights = np.concatenate([
+        np.arange(EQUIVALENCE_MIN_KG * 2, EQUIVALENCE_MAX_KG * 2 + 1) / 2,
+        pounds_to_kg(np.arange(kg_to_pounds(EQUIVALENCE_MIN_KG), kg_to_pounds(EQUIVALENCE_MAX_KG) + 1).round())
+    ])
+    forms, levels, names, kgs = (values.ravel() for values in np.meshgrid(
+        np.array(MUSHROOM_TYPES), np.array(list(DOSE_LEVELS)), np.array(list(by_potency.values())), weights,
+        indexing='ij'
+    ))
+    fixed = np.rint(calculate_doses(forms, levels, names, kgs)['dose_grams'] * 100)
+    exact = np.array([float_dose(*row) for row in zip(forms.tolist(), levels.tolist(), names.tolist(), kgs.tolist())])
+    rounded = np.array([round(value, 2) for value in exact.tolist()]) * 100
+    worst = float(np.abs(fixed - exact * 100).max()) - 0.5
+    return len(fixed), int((np.abs(fixed - rounded) > 0.5).sum()), worst
+
+
+def build_asset(grid_step=None):
+    """Build the encoded asset"""
+    data = build_tables()
+    if grid_step:
+        data['grid'] = build_grid(data, grid_step)
+    content = json.dumps(data, separators=(',', ':'), sort_keys=True)
+    version = hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+    return json.dumps({'version': version, **data}, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def build_service_worker(asset):
+    """
+    Render sw.js with its precache list and cache version
+    The version is the asset's version plus a hash of the other cached
+    files, so changing the strain tables or the page busts the cache
+    """
+    digest = hashlib.sha256()
+    for name in OFFLINE_FILES:
+        if name != './':
+            with open(os.path.join(ROOT, name), 'rb') as f:
+                digest.update(f.read())
+    version = f"{json.loads(asset)['version']}-{digest.hexdigest()[:8]}"
+    precache = json.dumps([*OFFLINE_FILES, os.path.basename(DEFAULT_OUTPUT)])
+
+    with open(SERVICE_WORKER, encoding='utf-8') as f:
+        source = f.read()
+    source = re.sub(r'^const CACHE_VERSION = .*;$', lambda m: f'const CACHE_VERSION = "{version}";', source,
+                    count=1, flags=re.M)
+    source = re.sub(r'^const PRECACHE = .*;$', lambda m: f'const PRECACHE = {precache};', source,
+                    count=1, flags=re.M)
+    return source.encode('utf-8')
+
+
+def uncached_references():
+    """
+    Find files index.html or its manifest load that sw.js does not precache
+    Any of these would make a repeat visit go to the network
+    Returns the references in the order found
+    """
+    with open(os.path.join(ROOT, 'index.html'), encoding='utf-8') as f:
+        references = [href or url for href, url in _PAGE_REFERENCE.findall(f.read())]
+    with open(os.path.join(ROOT, 'manifest.webmanifest'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    references += [manifest['start_url'], *(icon['src'] for icon in manifest.get('icons', []))]
+    cached = {*OFFLINE_FILES, os.path.basename(DEFAULT_OUTPUT)}
+    return [reference for reference in references if reference not in cached]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the static data asset for index.html')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='File to write')
+    parser.add_argument('--grid-step', type=int, help='Include a dose grid with this weight step in kg')
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES,
+                        help=f'Fail if the asset is larger than this (default {DEFAULT_MAX_BYTES})')
+    parser.add_argument('--check', action='store_true',
+                        help='Only check that the existing asset and sw.js are up to date')
+    args = parser.parse_args(argv)
+
+    rows, rounded_differently, worst = check_fixed_point()
+    if worst > EQUIVALENCE_SLACK_CG:
+        print(f'Fixed-point doses disagree with the float formula by {worst:.3f} centigrams past a rounding tie '
+              f'(allowed {EQUIVALENCE_SLACK_CG})', file=sys.stderr)
+        return 1
+    print(f'Fixed-point kernel matches the float formula on {rows} inputs '
+          f'({rounded_differently} rounded the other way, at most {max(worst, 0.0):.3f} centigrams past a tie)')
+
+    asset = build_asset(args.grid_step)
+    if len(asset) > args.max_bytes:
+        print(f'{args.output}: {len(asset)} bytes exceeds the {args.max_bytes} byte budget', file=sys.stderr)
+        return 1
+
+    uncached = uncached_references()
+    if uncached:
+        print(f'index.html loads files sw.js does not precache: {", ".join(uncached)}', file=sys.stderr)
+        return 1
+    # sw.js only caches the asset the page loads, so other outputs leave it alone
+    outputs = [(args.output, asset)]
+    if os.path.abspath(args.output) == DEFAULT_OUTPUT:
+        outputs.append((SERVICE_WORKER, build_service_worker(asset)))
+
+    if args.check:
+        stale = False
+        for path, content in outputs:
+            try:
+                with open(path, 'rb') as f:
+                    current = f.read()
+            except FileNotFoundError:
+                current = None
+            if current != content:
+                print(f'{path} is out of date; run python build_static.py', file=sys.stderr)
+                stale = True
+        if stale:
+            return 1
+        print(f'{", ".join(path for path, _ in outputs)} up to date ({len(asset)} byte asset)')
+        return 0
+
+    for path, content in outputs:
+        with open(path, 'wb') as f:
+            f.write(content)
+        print(f'Wrote {path} ({len(content)} bytes)')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+Anonymised log of dose calculations in SQLite
+Records the mushroom type, dose level, resolved strain, whether it was
+found, a body weight bucket and the dose of each calculation made through
+the app or the API, with the day it was made and nothing identifying the
+user. record() only puts the calculation on a bounded in-memory queue; a
+background thread writes queued calculations in batched transactions to a
+WAL-mode database, so requests never wait on the disk. When the queue is
+full new records are dropped and counted. Logging is off unless
+SHROOMIES_CALC_LOG names the database file (or enable() is called), and
+whatever is queued is written at exit.
+
+    SHROOMIES_CALC_LOG=calculations.db    log to this file
+    SHROOMIES_CALC_LOG_QUEUE=10000        records held before dropping
+
+    python calclog.py calculations.db --since 2026-01-01
+"""
+
+import argparse
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_QUEUE = 10000
+DEFAULT_BATCH_SIZE = 1000
+
+# Seconds the writer waits after a partial batch, so that under light load
+# records are still written in a few transactions rather than one each
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Body weights are stored as the lower bound of their bucket in kg, with
+# weights outside the range in the end buckets
+WEIGHT_BUCKET_KG = 10
+MAX_WEIGHT_BUCKET_KG = 400
+
+# Longer strain inputs are truncated
+MAX_STRAIN_LENGTH = 100
+
+# Seconds to wait for the writer to finish when closing
+CLOSE_TIMEOUT = 10.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calculations (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    mushroom_type TEXT NOT NULL,
+    dose_level TEXT NOT NULL,
+    strain TEXT NOT NULL,
+    strain_found INTEGER NOT NULL,
+    match_confidence REAL NOT NULL,
+    weight_bucket INTEGER NOT NULL,
+    dose_grams REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calculations_unmatched_strain
+    ON calculations (strain, day) WHERE strain_found = 0 AND match_confidence = 0;
+CREATE INDEX IF NOT EXISTS calculations_found_strain
+    ON calculations (strain, day) WHERE strain_found = 1;
+CREATE INDEX IF NOT EXISTS calculations_day
+    ON calculations (day, mushroom_type, dose_level, weight_bucket);
+"""
+
+_INSERT = """
+INSERT INTO calculations
+    (day, mushroom_type, dose_level, strain, strain_found, match_confidence, weight_bucket, dose_grams)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Columns counts_by() can group on
+COUNT_COLUMNS = ('day', 'mushroom_type', 'dose_level', 'weight_bucket')
+
+enabled = False
+_log = None
+
+# Logs inherited from a parent process; kept so that their connections,
+# which belong to the parent, are never closed in the child
+_inherited = []
+
+
+def connect(path):
+    """Open a log database, creating its table and indexes if needed"""
+    connection = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode = WAL')
+    # Safe with WAL: a crash can lose the last transactions but not corrupt the file
+    connection.execute('PRAGMA synchronous = NORMAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _row(day, mushroom_type, dose_level, weight_kg, result):
+    """Database row for one queued calculation"""
+    return (
+        day,
+        mushroom_type,
+        dose_level,
+        (result.normalized_strain or '')[:MAX_STRAIN_LENGTH],
+        int(result.strain_found),
+        result.match_confidence,
+        int(min(max(weight_kg, 0), MAX_WEIGHT_BUCKET_KG) // WEIGHT_BUCKET_KG) * WEIGHT_BUCKET_KG,
+        result.dose_grams
+    )
+
+
+class CalculationLog:
+    """
+    Queue of calculations written to one database by a background thread
+    The writer wakes every flush_interval seconds, or as soon as a full
+    batch is queued, and writes up to batch_size records per transaction.
+    record() only appends to a deque, so it takes no lock
+    """
+
+    def __init__(self, path, max_queue=DEFAULT_MAX_QUEUE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._records = deque()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        # Held while writing, so flush() and the writer take turns
+        self._write_lock = threading.Lock()
+        # Opened here so a bad path fails in enable() rather than in the thread
+        self._connection = connect(path)
+        self._thread = threading.Thread(target=self._run, name='calclog-writer', daemon=True)
+        self._thread.start()
+
+    def record(self, mushroom_type, dose_level, weight_kg, result):
+        """
+        Queue one calculate_dose call and its result without blocking
+        Returns False if the queue was full and the record was dropped
+        """
+        records = self._records
+        if len(records) >= self.max_queue:
+            # Counted without a lock, so concurrent drops may undercount
+            self.dropped += 1
+            return False
+        records.append((mushroom_type, dose_level, weight_kg, result))
+        if len(records) == self.batch_size:
+            self._wake.set()
+        return True
+
+    def _write(self, records):
+        day = time.strftime('%Y-%m-%d', time.gmtime())
+        rows = []
+        for record in records:
+            try:
+                rows.append(_row(day, *record))
+            except Exception:
+                logger.exception("Skipping a calculation that cannot be logged: %r", record)
+                self.dropped += 1
+        try:
+            with self._connection:
+                self._connection.executemany(_INSERT, rows)
+        except Exception:
+            logger.exception("Failed to write %d calculations to %s", len(rows), self.path)
+            self.dropped += len(rows)
+        else:
+            self.written += len(rows)
+
+    def _drain(self):
+        """Write everything queued, batch_size records per transaction"""
+        with self._write_lock:
+            records = self._records
+            while records:
+                batch = []
+                while records and len(batch) < self.batch_size:
+                    batch.append(records.popleft())
+                self._write(batch)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+        self._connection.close()
+
+    def flush(self):
+        """Write every record queued so far before returning"""
+        self._drain()
+
+    def close(self):
+        """Write what is queued and stop the writer"""
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(CLOSE_TIMEOUT)
+        if self._thread.is_alive():
+            logger.warning("Calculation log writer did not finish; %d records not written", len(self._records))
+
+
+def enable(path, max_queue=DEFAULT_MAX_QUEUE):
+    """Start logging calculations to a database file"""
+    global enabled, _log
+    disable()
+    _log = CalculationLog(path, max_queue)
+    enabled = True
+
+
+def disable():
+    """Stop logging, writing whatever is still queued"""
+    global enabled, _log
+    enabled = False
+    if _log is not None:
+        _log.close()
+        _log = None
+
+
+def record(mushroom_type, dose_level, weight_kg, result):
+    """Log one successful calculate_dose call if logging is enabled"""
+    log = _log
+    if log is not None:
+        log.record(mushroom_type, dose_level, weight_kg, result)
+
+
+def flush():
+    """Wait until the calculations logged so far are written"""
+    if _log is not None:
+        _log.flush()
+
+
+def _reopen_after_fork():
+    # The writer thread does not survive fork; a child gets its own queue
+    # and writer, and the parent keeps writing what it had queued
+    global _log
+    if _log is not None:
+        _inherited.append(_log)
+        _log = CalculationLog(_log.path, _log.max_queue, _log.batch_size, _log.flush_interval)
+
+
+os.register_at_fork(after_in_child=_reopen_after_fork)
+atexit.register(disable)
+
+
+def _where(since, conditions=()):
+    conditions = list(conditions)
+    if since is not None:
+        conditions.append('day >= :since')
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+
+def top_unknown_strains(connection, limit=10, since=None):
+    """
+    Strain inputs that matched no known strain, alias or potency category,
+    not even as a misspelling
+    Uses the partial index over unmatched strains, so the cost depends on the
+    number of unknown records rather than the size of the log
+    Returns (strain, count) pairs, most frequent first
+    """
+    where = _where(since, ['strain_found = 0', 'match_confidence = 0', "strain != ''"])
+    return connection.execute(
+        f'SELECT strain, COUNT(*) AS n FROM calculations {where} '
+        'GROUP BY strain ORDER BY n DESC, strain LIMIT :limit',
+        {'since': since, 'limit': limit}
+    ).fetchall()
+
+
+def top_strains(connection, limit=10, since=None):
+    """
+    Known strains calculations were made for
+    Returns (strain, count) pairs, most frequent first
+    """
+    where = _where(since, ['strain_found = 1'])
+    return connection.execute(
+        f'SELECT strain, COUNT(*) AS n FROM calculations {where} '
+        'GROUP BY strain ORDER BY n DESC, strain LIMIT :limit',
+        {'since': since, 'limit': limit}
+    ).fetchall()
+
+
+def counts_by(connection, column, since=None):
+    """
+    Number of calculations per value of one of COUNT_COLUMNS
+    Returns (value, count) pairs in value order
+    """
+    if column not in COUNT_COLUMNS:
+        raise ValueError(f"Unknown column '{column}'. Choose from: {', '.join(COUNT_COLUMNS)}")
+    return connection.execute(
+        f'SELECT {column}, COUNT(*) FROM calculations {_where(since)} GROUP BY {column} ORDER BY {column}',
+        {'since': since}
+    ).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize a calculation log')
+    parser.add_argument('database', help='Calculation log database file')
+    parser.add_argument('--since', help='Only count calculations from this day on (YYYY-MM-DD)')
+    parser.add_argument('--limit', type=int, default=10, help='Strains listed per table (default 10)')
+    args = parser.parse_args(argv)
+
+    connection = sqlite3.connect(f'file:{args.database}?mode=ro', uri=True)
+    try:
+        sections = [
+            ('Unknown strain inputs', top_unknown_strains(connection, args.limit, args.since)),
+            ('Known strains', top_strains(connection, args.limit, args.since)),
+            *((f'By {column}', counts_by(connection, column, args.since))
+              for column in ('mushroom_type', 'dose_level', 'weight_bucket'))
+        ]
+    finally:
+        connection.close()
+    for title, rows in sections:
+        print(title)
+        for value, count in rows:
+            print(f'  {count:10d}  {value}')
+
+
+if os.environ.get('SHROOMIES_CALC_LOG'):
+    enable(os.environ['SHROOMIES_CALC_LOG'], int(os.environ.get('SHROOMIES_CALC_LOG_QUEUE', DEFAULT_MAX_QUEUE)))
+
+
+if __name__ == "__main__":
+    main()
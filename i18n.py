@@ -0,0 +1,183 @@
+"""
+Translation catalogs for the dose calculator
+UI strings live in gettext catalogs under locales/<lang>/LC_MESSAGES,
+keyed by message name. Compiled .mo catalogs are loaded on first use
+per language and cached for the whole process, so languages nobody
+selects cost nothing at startup
+
+    python i18n.py compile
+    python i18n.py compile --check
+"""
+
+import argparse
+import ast
+import os
+import struct
+import sys
+import threading
+
+LOCALE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+DOMAIN = 'shroomies'
+
+DEFAULT_LANGUAGE = 'en'
+
+# Display names for the language selector, in menu order
+LANGUAGES = {
+    'en': 'English',
+    'es': 'Español (PR)'
+}
+
+MO_MAGIC = 0x950412de
+
+_catalogs = {}
+_lock = threading.RLock()
+
+
+def catalog_path(language, extension='.mo'):
+    """Path of a language's catalog file"""
+    return os.path.join(LOCALE_DIR, language, 'LC_MESSAGES', DOMAIN + extension)
+
+
+def read_mo(path):
+    """
+    Read a compiled gettext catalog
+    Returns a dict of msgid to msgstr, without the header entry
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, = struct.unpack_from('<I', data)
+    order = '<' if magic == MO_MAGIC else '>'
+    _, count, originals, translations = struct.unpack_from(order + '4I', data, 4)
+    messages = {}
+    for i in range(count):
+        key_length, key_offset = struct.unpack_from(order + '2I', data, originals + i * 8)
+        value_length, value_offset = struct.unpack_from(order + '2I', data, translations + i * 8)
+        key = data[key_offset:key_offset + key_length].decode('utf-8')
+        if key:
+            messages[key] = data[value_offset:value_offset + value_length].decode('utf-8')
+    return messages
+
+
+def write_mo(path, messages):
+    """Write a dict of msgid to msgstr as a compiled gettext catalog"""
+    entries = sorted({'': 'Content-Type: text/plain; charset=UTF-8\n', **messages}.items())
+    keys = [key.encode('utf-8') for key, _ in entries]
+    values = [value.encode('utf-8') for _, value in entries]
+    count = len(entries)
+    originals = 28
+    translations = originals + count * 8
+    offset = translations + count * 8
+
+    tables = []
+    strings = []
+    for table in (keys, values):
+        for string in table:
+            tables.append(struct.pack('<2I', len(string), offset))
+            strings.append(string + b'\0')
+            offset += len(string) + 1
+
+    header = struct.pack('<7I', MO_MAGIC, 0, count, originals, translations, 0, offset)
+    with open(path, 'wb') as f:
+        f.write(header + b''.join(tables) + b''.join(strings))
+
+
+def read_po(path):
+    """
+    Read a gettext .po source file
+    Returns a dict of msgid to msgstr; fuzzy and untranslated entries are
+    skipped
+    """
+    messages = {}
+    entry = {}
+    fuzzy = False
+    field = None
+
+    def finish():
+        if entry.get('msgid') and entry.get('msgstr') and not fuzzy:
+            messages[entry['msgid']] = entry['msgstr']
+
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if (not line or line.startswith(('#', 'msgid '))) and 'msgstr' in entry:
+                finish()
+                entry = {}
+                fuzzy = False
+                field = None
+            if not line:
+                continue
+            if line.startswith('#'):
+                fuzzy = fuzzy or (line.startswith('#,') and 'fuzzy' in line)
+                continue
+            if line.startswith(('msgid ', 'msgstr ')):
+                field, _, line = line.partition(' ')
+                entry[field] = ''
+            if field is None or not line.startswith('"'):
+                raise ValueError(f'{path}:{number}: cannot parse {line!r}')
+            entry[field] += ast.literal_eval(line)
+    finish()
+    return messages
+
+
+def compile_catalogs(check=False):
+    """
+    Compile every locales/<lang>/LC_MESSAGES/shroomies.po to .mo
+    With check, only report catalogs whose .mo is missing or stale
+    Returns the paths written (or found stale)
+    """
+    changed = []
+    for language in sorted(os.listdir(LOCALE_DIR)):
+        source = catalog_path(language, '.po')
+        if not os.path.exists(source):
+            continue
+        target = catalog_path(language)
+        messages = read_po(source)
+        try:
+            current = read_mo(target)
+        except FileNotFoundError:
+            current = None
+        if current == messages:
+            continue
+        changed.append(target)
+        if not check:
+            write_mo(target, messages)
+    return changed
+
+
+def get_catalog(language):
+    """
+    Get the messages for a language, loading its catalog on first use
+    Messages missing from a catalog fall back to DEFAULT_LANGUAGE
+    """
+    catalog = _catalogs.get(language)
+    if catalog is None:
+        with _lock:
+            catalog = _catalogs.get(language)
+            if catalog is None:
+                catalog = read_mo(catalog_path(language))
+                if language != DEFAULT_LANGUAGE:
+                    catalog = {**get_catalog(DEFAULT_LANGUAGE), **catalog}
+                _catalogs[language] = catalog
+    return catalog
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the translation catalogs')
+    commands = parser.add_subparsers(dest='command', required=True)
+    compile_parser = commands.add_parser('compile', help='Compile .po sources to .mo catalogs')
+    compile_parser.add_argument('--check', action='store_true',
+                                help='Only check that the compiled catalogs are up to date')
+    args = parser.parse_args(argv)
+
+    changed = compile_catalogs(check=args.check)
+    if args.check:
+        for path in changed:
+            print(f'{path} is out of date; run python i18n.py compile', file=sys.stderr)
+        return 1 if changed else 0
+    for path in changed:
+        print(f'Wrote {path}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+Concurrent-session load test for the Streamlit app
+Starts app.py under a local headless Streamlit server and drives many
+simulated browser sessions against that one process over its websocket
+protocol, each following a scripted flow (language switch, strain entry,
+strain suggestions, calculate). Reports rerun latency percentiles,
+throughput, server CPU time and messages and bytes sent per rerun, and server memory
+growth per session for each concurrency level, and writes the results
+to a JSON file that can be compared against a previous run. Needs the
+loadtest extra (websockets): uv sync --extra loadtest
+
+    python loadtest.py --sessions 1,8,32 --output loadtest.json
+    python loadtest.py --output new.json --compare loadtest.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from bench import APP_PATH, compare
+from i18n import LANGUAGES, get_catalog
+
+LANGUAGE_LABEL = '🌐 Language / Idioma'
+
+# Scripted user flows; each step is one rerun. Steps name catalog keys,
+# which are resolved to labels in the session's current language, except
+# for the language selector and strain suggestions
+FLOWS = {
+    'strain_lookup': [
+        ('select', LANGUAGE_LABEL, 'en'),
+        ('radio', 'strain_method', 'specific_strain'),
+        ('text', 'strain_name', 'Golden Teacher'),
+        ('click', 'calculate_btn', None)
+    ],
+    'strain_suggestion': [
+        ('select', LANGUAGE_LABEL, 'es'),
+        ('radio', 'strain_method', 'specific_strain'),
+        ('text', 'strain_name', 'pen'),
+        ('pick', 'Penis Envy', None),
+        ('click', 'calculate_btn', None)
+    ],
+    'general_potency': [
+        ('select', LANGUAGE_LABEL, 'es'),
+        ('select', LANGUAGE_LABEL, 'en'),
+        ('click', 'calculate_btn', None),
+        ('click', 'calculate_btn', None)
+    ]
+}
+
+DONE_STATUSES = (
+    ForwardMsg.FINISHED_SUCCESSFULLY,
+    ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY
+)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, timeout=60):
+    """Start app.py under a headless Streamlit server and wait until it is healthy"""
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'streamlit', 'run', APP_PATH,
+            '--server.headless', 'true',
+            '--server.address', '127.0.0.1',
+            '--server.port', str(port),
+            '--server.enableXsrfProtection', 'false',
+            '--server.fileWatcherType', 'none',
+            '--browser.gatherUsageStats', 'false'
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'Streamlit server exited with code {server.returncode}')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('Streamlit server did not become healthy')
+
+
+def cpu_seconds(pid):
+    """User plus system CPU time of a process, or None where /proc is unavailable"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rpartition(')')[2].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def resident_kib(pid):
+    """Resident memory of a process in KiB, or None where /proc is unavailable"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class Session:
+    """
+    One simulated browser session
+    Keeps the widget values a browser would send back on every rerun,
+    keyed by widget id, and the widgets rendered by the last run, keyed
+    by label
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.websocket = None
+        self.language = 'en'
+        self.widgets = {}
+        self.states = {}
+        self.bytes_received = 0
+        self.messages_received = 0
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None)
+
+    async def close(self):
+        await self.websocket.close()
+
+    async def rerun(self, trigger=None, fragment_id=''):
+        """
+        Request a rerun with the current widget values and wait for it to
+        finish
+        Returns the rerun latency in seconds
+        """
+        message = BackMsg()
+        client_state = message.rerun_script
+        client_state.query_string = ''
+        client_state.page_script_hash = ''
+        client_state.fragment_id = fragment_id
+        for widget_id, value in self.states.items():
+            state = client_state.widget_states.widgets.add()
+            state.id = widget_id
+            state.string_value = value
+        if trigger:
+            state = client_state.widget_states.widgets.add()
+            state.id = trigger
+            state.trigger_value = True
+
+        start = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        widgets = {} if not fragment_id else dict(self.widgets)
+        while True:
+            data = await self.websocket.recv()
+            self.bytes_received += len(data)
+            self.messages_received += 1
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    raise RuntimeError(element.exception.message)
+                widget = getattr(element, element_type)
+                widget_id = getattr(widget, 'id', None) if hasattr(widget, 'label') else None
+                if widget_id:
+                    widgets[widget.label] = (widget_id, forward.delta.fragment_id)
+                    # Values set by the app, e.g. from session_state in a callback
+                    if getattr(widget, 'set_value', False) and isinstance(getattr(widget, 'value', None), str):
+                        self.states[widget_id] = widget.value
+            elif kind == 'script_finished' and forward.script_finished in DONE_STATUSES:
+                break
+        self.widgets = widgets
+        return time.perf_counter() - start
+
+    async def step(self, action, key, value):
+        """Apply one flow step and rerun; returns the rerun latency"""
+        t = get_catalog(self.language)
+        label = key if action in ('select', 'pick') else t[key]
+        widget_id, fragment_id = self.widgets[label]
+        if action in ('click', 'pick'):
+            return await self.rerun(trigger=widget_id, fragment_id=fragment_id)
+        if action == 'select':
+            self.language = value
+            self.states[widget_id] = LANGUAGES[value]
+        elif action == 'radio':
+            self.states[widget_id] = t[value]
+        elif action == 'text':
+            self.states[widget_id] = value
+        else:
+            raise ValueError(f"Unknown flow step: {action}")
+        return await self.rerun(fragment_id=fragment_id)
+
+
+async def run_session(url, flow, iterations, latencies, ready, release):
+    """
+    Run one session through a flow, appending each rerun's latency in
+    seconds to latencies, then hold the session open until released so
+    its server-side state can be measured
+    Appends the (messages, bytes) the session received to ready when done
+    """
+    session = Session(url)
+    try:
+        await session.connect()
+        latencies.append(await session.rerun())
+        for _ in range(iterations):
+            for action, key, value in FLOWS[flow]:
+                latencies.append(await session.step(action, key, value))
+    finally:
+        ready.append((session.messages_received, session.bytes_received))
+        await release.wait()
+        if session.websocket is not None:
+            await session.close()
+
+
+async def run_level(url, server_pid, sessions, iterations):
+    """
+    Run sessions concurrent sessions, cycling through the flows
+    Returns a summary dict for this concurrency level
+    """
+    flows = list(FLOWS)
+    latencies = []
+    ready = []
+    release = asyncio.Event()
+    memory_before = resident_kib(server_pid)
+    cpu_before = cpu_seconds(server_pid)
+
+    start = time.perf_counter()
+    tasks = [
+        asyncio.create_task(run_session(url, flows[i % len(flows)], iterations, latencies, ready, release))
+        for i in range(sessions)
+    ]
+    while len(ready) < sessions:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    cpu_after = cpu_seconds(server_pid)
+    memory_after = resident_kib(server_pid)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    summary = {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'errors': [f'{type(e).__name__}: {e}' for e in results if isinstance(e, BaseException)],
+        'seconds': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'messages_per_rerun': sum(messages for messages, _ in ready) / len(latencies) if latencies else 0.0,
+        'bytes_per_rerun': sum(size for _, size in ready) / len(latencies) if latencies else 0.0
+    }
+    if cpu_before is not None and cpu_after is not None and latencies:
+        summary['server_cpu_ms_per_rerun'] = (cpu_after - cpu_before) * 1000 / len(latencies)
+    if memory_before is not None and memory_after is not None:
+        summary['memory_per_session_kib'] = (memory_after - memory_before) / sessions
+    if latencies:
+        for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            summary[f'{name}_ms'] = percentile(latencies, fraction) * 1000
+    return summary
+
+
+def comparable(levels):
+    """
+    Flatten level summaries into metrics where larger is worse, for
+    bench.compare
+    """
+    results = {}
+    for level in levels:
+        sessions = level['sessions']
+        for name in ('p50_ms', 'p95_ms', 'p99_ms', 'server_cpu_ms_per_rerun', 'messages_per_rerun',
+                     'bytes_per_rerun', 'memory_per_session_kib'):
+            if name in level:
+                results[f'{name}[{sessions}]'] = level[name]
+        if level['throughput_rps']:
+            results[f'seconds_per_rerun[{sessions}]'] = 1 / level['throughput_rps']
+    return results
+
+
+async def run_levels(port, server_pid, levels, iterations):
+    url = f'ws://127.0.0.1:{port}/_stcore/stream'
+    # Warm up imports and caches so the first level is not charged for them
+    await run_level(url, server_pid, len(FLOWS), 1)
+    return [await run_level(url, server_pid, sessions, iterations) for sessions in levels]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the Streamlit app with concurrent sessions')
+    parser.add_argument('--sessions', default='1,8,32',
+                        help='Comma-separated concurrency levels to run (default 1,8,32)')
+    parser.add_argument('--iterations', type=int, default=3, help='Times each session repeats its flow')
+    parser.add_argument('--port', type=int, help='Port for the local server (default: a free port)')
+    parser.add_argument('--output', default='loadtest.json', help='JSON file to write results to')
+    parser.add_argument('--compare', help='Baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative increase that counts as a regression (default 0.2)')
+    args = parser.parse_args(argv)
+
+    port = args.port or free_port()
+    server = start_server(port)
+    try:
+        levels = asyncio.run(run_levels(
+            port, server.pid, [int(value) for value in args.sessions.split(',')], args.iterations
+        ))
+    finally:
+        server.terminate()
+        server.wait()
+
+    for level in levels:
+        print(
+            f"{level['sessions']:4} sessions  {level['reruns']:6} reruns  {level['throughput_rps']:8.1f} reruns/s  "
+            f"p50 {level.get('p50_ms', 0):8.1f} ms  p95 {level.get('p95_ms', 0):8.1f} ms  "
+            f"p99 {level.get('p99_ms', 0):8.1f} ms  cpu {level.get('server_cpu_ms_per_rerun', 0):6.1f} ms/rerun  "
+            f"{level['messages_per_rerun']:5.1f} msgs/rerun  {level['bytes_per_rerun']:8.0f} B/rerun  {level.get('memory_per_session_kib', 0):8.0f} KiB/session"
+        )
+        for error in level['errors']:
+            print(f'ERROR {error}', file=sys.stderr)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'iterations': args.iterations,
+                'flows': list(FLOWS)
+            },
+            'levels': levels,
+            'results': comparable(levels)
+        }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(comparable(levels), baseline, args.threshold)
+        for name, previous, current, change in regressions:
+            print(f'REGRESSION {name}: {previous:,.1f} -> {current:,.1f} (+{change:.0%})')
+        if regressions:
+            return 1
+    return 1 if any(level['errors'] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
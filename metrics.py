@@ -0,0 +1,297 @@
+"""
+Prometheus-style metrics for the dose calculator
+Counts calculate_dose calls, strain lookup outcomes and errors, and times
+calculations, app.main reruns and runs of the app's fragments. Metrics are off unless SHROOMIES_METRICS
+is set (or enable() is called); when off, the engine only checks a None
+hook. Export with render(), write_textfile() or serve().
+"""
+
+import functools
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import shroomies
+
+CALCULATION_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 1e-3, 1e-2)
+RERUN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+enabled = False
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class _ThreadShard:
+    """Holds one thread's values; collected when the thread exits"""
+
+    __slots__ = ('values', '__weakref__')
+
+    def __init__(self):
+        self.values = {}
+
+
+class _Metric:
+    """
+    Base for metrics whose values are sharded per thread
+    Each thread updates its own dict without locking; the shards are only
+    summed when the metric is rendered. When a thread exits its shard is
+    folded into a shared total, so short-lived threads (Streamlit runs each
+    rerun in a new one) do not leave a shard behind each
+    """
+
+    kind = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._local = threading.local()
+        # Live shards by id, and the totals of shards whose thread has exited
+        self._shards = {}
+        self._retired = {}
+        # Reentrant because a shard can be retired by garbage collection
+        # while its thread holds the lock
+        self._lock = threading.RLock()
+
+    def _shard(self):
+        try:
+            return self._local.shard.values
+        except AttributeError:
+            shard = self._local.shard = _ThreadShard()
+            with self._lock:
+                self._shards[id(shard.values)] = shard.values
+            weakref.finalize(shard, self._retire, shard.values)
+            return shard.values
+
+    def _retire(self, values):
+        with self._lock:
+            self._fold(self._retired, values)
+            del self._shards[id(values)]
+
+    def _fold(self, totals, values):
+        raise NotImplementedError
+
+    def _totals(self):
+        totals = {}
+        with self._lock:
+            self._fold(totals, self._retired)
+            for values in self._shards.values():
+                self._fold(totals, values)
+        return totals
+
+    def render(self):
+        return [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        values = self._shard()
+        values[label_values] = values.get(label_values, 0) + amount
+
+    def _fold(self, totals, values):
+        for labels, count in list(values.items()):
+            totals[labels] = totals.get(labels, 0) + count
+
+    def value(self, *label_values):
+        return self._totals().get(label_values, 0)
+
+    def render(self):
+        lines = super().render()
+        for labels, count in sorted(self._totals().items()):
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {count}')
+        return lines
+
+
+class Histogram(_Metric):
+    """Latency histogram with fixed buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets=CALCULATION_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        values = self._shard()
+        state = values.get(label_values)
+        if state is None:
+            # Per-bucket counts (last one is +Inf), then sum
+            state = values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _fold(self, totals, values):
+        for labels, state in list(values.items()):
+            total = totals.setdefault(labels, [0] * len(state))
+            for i, count in enumerate(state):
+                total[i] += count
+
+    def render(self):
+        lines = super().render()
+        for labels, state in sorted(self._totals().items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), state):
+                cumulative += count
+                le = (('le', bound if bound == '+Inf' else repr(bound)),)
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, labels)} {state[-1]}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+CALCULATIONS = Counter(
+    'shroomies_calculations_total',
+    'calculate_dose calls by outcome (ok, unknown_dose_level, unknown_mushroom_type, invalid_weight or error)',
+    ['outcome']
+)
+CALCULATION_SECONDS = Histogram(
+    'shroomies_calculation_seconds', 'calculate_dose latency in seconds', buckets=CALCULATION_BUCKETS
+)
+STRAIN_LOOKUPS = Counter(
+    'shroomies_strain_lookups_total', 'Strain lookups in calculate_dose by result', ['result']
+)
+RERUN_SECONDS = Histogram(
+    'shroomies_app_rerun_seconds', 'app.main script run duration in seconds',
+    ['language', 'strain_method'], buckets=RERUN_BUCKETS
+)
+FRAGMENT_SECONDS = Histogram(
+    'shroomies_app_fragment_seconds', 'app fragment run duration in seconds, including runs within app.main',
+    ['fragment'], buckets=RERUN_BUCKETS
+)
+
+REGISTRY = [CALCULATIONS, CALCULATION_SECONDS, STRAIN_LOOKUPS, RERUN_SECONDS, FRAGMENT_SECONDS]
+
+
+def _lookup_result(strain_input, result):
+    """Classify how calculate_dose resolved the strain input"""
+    if not strain_input:
+        return 'empty'
+    if result['strain_found']:
+        if result['normalized_strain'] != strain_input.lower().strip():
+            return 'alias'
+        return 'hit'
+    if result['match_confidence'] == 1.0:
+        return 'category'
+    if result['match_confidence'] > 0.0:
+        return 'fuzzy'
+    return 'miss'
+
+
+def _failure_outcome(error, mushroom_type, dose_level, weight_kg):
+    """Classify why a calculate_dose call raised, by the input at fault"""
+    if isinstance(error, KeyError) and isinstance(dose_level, str) and dose_level not in shroomies.DOSE_LEVELS:
+        return 'unknown_dose_level'
+    if isinstance(error, ValueError):
+        if isinstance(mushroom_type, str) and mushroom_type not in shroomies.MUSHROOM_TYPES:
+            return 'unknown_mushroom_type'
+        if weight_kg != weight_kg:
+            return 'invalid_weight'
+    return 'error'
+
+
+def _observe_calculation(calculate, mushroom_type, dose_level, strain_input, weight_kg):
+    """Engine hook timing and counting one calculate_dose call"""
+    start = time.perf_counter()
+    try:
+        result = calculate(mushroom_type, dose_level, strain_input, weight_kg)
+    except Exception as e:
+        CALCULATIONS.inc(_failure_outcome(e, mushroom_type, dose_level, weight_kg))
+        raise
+    CALCULATION_SECONDS.observe(time.perf_counter() - start)
+    CALCULATIONS.inc('ok')
+    STRAIN_LOOKUPS.inc(_lookup_result(strain_input, result))
+    return result
+
+
+def enable():
+    """Start collecting metrics"""
+    global enabled
+    enabled = True
+    shroomies.set_observer(_observe_calculation)
+
+
+def disable():
+    """Stop collecting metrics; collected values are kept"""
+    global enabled
+    enabled = False
+    shroomies.set_observer(None)
+
+
+def observe_rerun(language, strain_method, seconds):
+    """Record the duration of one app.main script run"""
+    RERUN_SECONDS.observe(seconds, language, strain_method)
+
+
+def timed_fragment(func):
+    """
+    Decorator recording the duration of each run of an app fragment
+    Apply it under @st.fragment, so that reruns of just the fragment,
+    which skip app.main, are timed too
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            FRAGMENT_SECONDS.observe(time.perf_counter() - start, name)
+    return wrapper
+
+
+def render():
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path):
+    """Atomically write the metrics to a file, e.g. for node_exporter's textfile collector"""
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(render())
+    os.replace(temp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1'):
+    """Serve the metrics over HTTP from a background thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
+
+
+if os.environ.get('SHROOMIES_METRICS'):
+    enable()
+    if os.environ.get('SHROOMIES_METRICS_PORT'):
+        serve(int(os.environ['SHROOMIES_METRICS_PORT']))
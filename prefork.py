@@ -0,0 +1,403 @@
+"""
+Pre-fork multi-worker launcher for the headless API
+Builds the strain table and its lookup indexes once in the parent,
+publishes them as one read-only file in shared memory (/dev/shm), and
+forks uvicorn workers that all accept on one listening socket. Workers
+map the file and read names, potencies and index postings in place, so
+their memory does not grow with the catalogue. When the strain table
+changes (SHROOMIES_STRAIN_DB reloads in the parent) a new generation is
+published, and each worker swaps to it whole before its next request.
+Requires uvicorn, from the serve extra: uv sync --extra serve
+
+    python prefork.py --workers 4 --port 8000
+"""
+
+import argparse
+import gc
+import json
+import logging
+import mmap
+import os
+import signal
+import socket
+import struct
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+
+import calclog
+import shroomies
+from shroomies import CompactStrainStore, StrainTable
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SHRMTBL1'
+
+# Table file: magic and header JSON length, then the header, then the
+# sections it lists, each starting on an mmap allocation boundary
+_PREFIX = struct.Struct('<8sI')
+
+# Control file: a seqlock sequence number (odd while a publish is in
+# progress) followed by the published generation
+_SEQUENCE = struct.Struct('<Q')
+_GENERATION = struct.Struct('<Q')
+_CONTROL_SIZE = _SEQUENCE.size + _GENERATION.size
+
+
+def _align(offset):
+    return -(-offset // mmap.ALLOCATIONGRANULARITY) * mmap.ALLOCATIONGRANULARITY
+
+
+class _PackedStrings(Sequence):
+    """Strings stored as one UTF-8 blob and an offsets array, decoded on access"""
+
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode('utf-8')
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+
+class _IndexedNames(Sequence):
+    """Names looked up through an array of positions in another sequence"""
+
+    def __init__(self, positions, names):
+        self._positions = positions
+        self._names = names
+
+    def __getitem__(self, i):
+        return self._names[self._positions[i]]
+
+    def __len__(self):
+        return len(self._positions)
+
+
+class _PackedPostings:
+    """Trigram -> key ids postings of a fuzzy index, read from packed arrays"""
+
+    def __init__(self, grams, offsets, key_ids):
+        self._grams = grams
+        self._offsets = offsets
+        self._key_ids = key_ids
+
+    def get(self, gram, default=None):
+        i = bisect_left(self._grams, gram)
+        if i < len(self._grams) and self._grams[i] == gram:
+            return self._key_ids[self._offsets[i]:self._offsets[i + 1]]
+        return default
+
+
+def _pack_strings(strings):
+    blob = bytearray()
+    offsets = array('I', [0])
+    for string in strings:
+        blob += string.encode('utf-8')
+        offsets.append(len(blob))
+    return bytes(blob), offsets
+
+
+def pack_strain_table(table):
+    """
+    Serialize a strain table and its indexes into the shared file layout
+    Returns the file contents
+    """
+    if not table.compact:
+        table = StrainTable(
+            CompactStrainStore.from_items(table.strain_potencies.items()),
+            table.potency_categories, table.aliases, source=table.source
+        )
+    store = table.strain_potencies
+    _, sizes, postings = table.fuzzy_index
+    grams = sorted(postings)
+    gram_blob, gram_offsets = _pack_strings(grams)
+    posting_offsets = array('I', [0])
+    key_ids = array('I')
+    for gram in grams:
+        key_ids.extend(postings[gram])
+        posting_offsets.append(len(key_ids))
+    words, word_names = table.completion_index[2]
+    word_blob, word_offsets = _pack_strings(words)
+    positions = {name: i for i, name in enumerate(table.strain_names)}
+    word_positions = array('I', (positions[name] for name in word_names))
+
+    sections = {
+        'names': ('B', store.blob),
+        'name_offsets': ('I', store.offsets),
+        'potencies': ('d', store.potencies),
+        'sizes': ('H', sizes),
+        'grams': ('B', gram_blob),
+        'gram_offsets': ('I', gram_offsets),
+        'posting_offsets': ('I', posting_offsets),
+        'key_ids': ('I', key_ids),
+        'words': ('B', word_blob),
+        'word_offsets': ('I', word_offsets),
+        'word_positions': ('I', word_positions)
+    }
+    layout = {}
+    offset = 0
+    for name, (typecode, data) in sections.items():
+        data = sections[name] = bytes(data)
+        layout[name] = (offset, len(data), typecode)
+        offset = _align(offset + len(data))
+    header = json.dumps({
+        'categories': table.potency_categories,
+        'aliases': table.aliases,
+        'source': table.source,
+        'sections': layout
+    }).encode('utf-8')
+
+    start = _align(_PREFIX.size + len(header))
+    contents = bytearray(start + offset)
+    _PREFIX.pack_into(contents, 0, MAGIC, len(header))
+    contents[_PREFIX.size:_PREFIX.size + len(header)] = header
+    for name, (offset, length, _) in layout.items():
+        contents[start + offset:start + offset + length] = sections[name]
+    return bytes(contents)
+
+
+def attach_strain_table(path):
+    """
+    Map a packed strain table file and build a StrainTable reading from it
+    Only the categories, aliases and their lookup dict are copied into the
+    process; everything else is read from the shared pages
+    """
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = _PREFIX.unpack_from(mapping)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a packed strain table")
+        header = json.loads(mapping[_PREFIX.size:_PREFIX.size + header_length])
+        start = _align(_PREFIX.size + header_length)
+        view = memoryview(mapping)
+
+        def section(name):
+            offset, length, typecode = header['sections'][name]
+            if typecode != 'B':
+                return view[start + offset:start + offset + length].cast(typecode)
+            if not length:
+                return b''
+            # A mapping of its own so slices are bytes, which compare in order
+            return mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=start + offset)
+
+        store = CompactStrainStore(section('names'), section('name_offsets'), section('potencies'))
+        postings = _PackedPostings(
+            _PackedStrings(section('grams'), section('gram_offsets')),
+            section('posting_offsets'),
+            section('key_ids')
+        )
+        words = (
+            _PackedStrings(section('words'), section('word_offsets')),
+            _IndexedNames(section('word_positions'), store.names)
+        )
+    return StrainTable(
+        store, header['categories'], header['aliases'], source=header['source'],
+        fuzzy_postings=(section('sizes'), postings), completion_words=words
+    )
+
+
+class SharedStrainTables:
+    """
+    Strain tables published to shared memory under one path prefix
+    The parent publishes each new table as a numbered generation file and
+    bumps the generation in a small control file under a seqlock; workers
+    call refresh() to pick up the latest generation
+    """
+
+    def __init__(self, prefix, control):
+        self.prefix = prefix
+        self.control = control
+        self.owner = os.getpid()
+        self.sequence = None
+        self.generation = 0
+        self.table = None
+
+    @classmethod
+    def create(cls, directory=None):
+        """Create the control file for a new set of shared tables"""
+        if directory is None:
+            directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        prefix = os.path.join(directory, f'shroomies-{os.getpid()}')
+        with open(prefix + '.control', 'w+b') as f:
+            f.write(bytes(_CONTROL_SIZE))
+            f.flush()
+            control = mmap.mmap(f.fileno(), _CONTROL_SIZE)
+        return cls(prefix, control)
+
+    def _path(self, generation):
+        return f'{self.prefix}.{generation}'
+
+    def publish(self, table):
+        """
+        Publish a table as the next generation and switch this process to it
+        The generation file is complete before the control file names it,
+        and the previous generation's file is unlinked; processes that
+        still map it keep reading it until they refresh
+        """
+        previous = self.generation
+        generation = previous + 1
+        temp_path = self._path(generation) + '.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(pack_strain_table(table))
+            os.replace(temp_path, self._path(generation))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        sequence, = _SEQUENCE.unpack_from(self.control)
+        _SEQUENCE.pack_into(self.control, 0, sequence + 1)
+        _GENERATION.pack_into(self.control, _SEQUENCE.size, generation)
+        _SEQUENCE.pack_into(self.control, 0, sequence + 2)
+
+        self.refresh()
+        if previous:
+            os.unlink(self._path(previous))
+
+    def refresh(self):
+        """
+        Switch to the latest published table if there is a new one
+        Costs one read of the control file when nothing changed
+        Returns whether the table was switched
+        """
+        sequence, = _SEQUENCE.unpack_from(self.control)
+        if sequence == self.sequence or sequence & 1:
+            return False
+        generation, = _GENERATION.unpack_from(self.control, _SEQUENCE.size)
+        if _SEQUENCE.unpack_from(self.control)[0] != sequence:
+            return False
+        self.sequence = sequence
+        if generation == self.generation:
+            return False
+        try:
+            table = attach_strain_table(self._path(generation))
+        except FileNotFoundError:
+            # Superseded while attaching; the next refresh sees the newer one
+            self.sequence = None
+            return False
+        self.generation = generation
+        self.table = table
+        shroomies.set_strain_table(table)
+        return True
+
+    def close(self):
+        """Remove the shared files (only in the process that created them)"""
+        if os.getpid() != self.owner:
+            return
+        for path in (self.prefix + '.control', self._path(self.generation)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def worker_app(shared, app):
+    """Wrap an ASGI app so each request first picks up any new strain table"""
+    async def refreshing_app(scope, receive, send):
+        shared.refresh()
+        await app(scope, receive, send)
+    return refreshing_app
+
+
+def _run_worker(sock, shared):
+    import uvicorn
+
+    from service import app
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(worker_app(shared, app), access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(host='127.0.0.1', port=8000, workers=None, interval=1.0):
+    """
+    Publish the strain table, fork workers and supervise them
+    Every interval seconds the parent republishes the strain table if it
+    changed and replaces workers that exited
+    """
+    import uvicorn  # noqa: F401 - loaded before forking so workers share it
+
+    import service  # noqa: F401
+
+    workers = workers or os.cpu_count() or 1
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    shared = SharedStrainTables.create()
+    try:
+        shared.publish(shroomies.get_strain_table())
+        with socket.create_server((host, port), backlog=2048) as sock:
+            _supervise(sock, shared, workers, interval, lambda: stopping)
+    finally:
+        shared.close()
+
+
+def _supervise(sock, shared, workers, interval, stopping):
+    """Keep worker processes running and the shared table current until stopping()"""
+    children = set()
+    try:
+        while not stopping():
+            if len(children) < workers:
+                # Free what loading the table left behind, then keep the
+                # parent's objects out of the workers' garbage collections,
+                # which would otherwise copy their pages
+                gc.collect()
+                gc.freeze()
+            while len(children) < workers:
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        _run_worker(sock, shared)
+                    finally:
+                        # os._exit skips atexit, so write the queued log here
+                        calclog.disable()
+                        os._exit(0)
+                children.add(pid)
+            time.sleep(interval)
+
+            if shroomies.get_strain_table() is not shared.table:
+                try:
+                    shared.publish(shroomies.get_strain_table())
+                except Exception:
+                    logger.exception("Failed to publish the strain table; workers keep the previous one")
+            while children:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+                if not pid:
+                    break
+                children.discard(pid)
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+        for pid in children:
+            os.waitpid(pid, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the headless API from pre-forked workers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Seconds between checks for a changed strain table and exited workers')
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.interval)
+
+
+if __name__ == "__main__":
+    main()
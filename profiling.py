@@ -0,0 +1,279 @@
+"""
+Opt-in profiling of app reruns and engine calls
+Samples app.main reruns, runs of the app's fragments and the public
+shroomies functions under cProfile and tracemalloc, and writes for each
+sample a .prof file (for pstats or snakeviz), collapsed stacks (for
+flamegraph.pl or speedscope) and the top allocations by size. Profiling
+is off unless SHROOMIES_PROFILE is set (or configure() is called); when
+off, the engine is not wrapped and app.py only checks a flag.
+
+    SHROOMIES_PROFILE=1          sample reruns, fragment runs and engine calls
+    SHROOMIES_PROFILE=query      profile only runs of pages opened with ?profile=1
+    SHROOMIES_PROFILE_RATE=0.05  fraction of reruns and calls sampled (default 1)
+    SHROOMIES_PROFILE_DIR=path   report directory (default ./profiles)
+    SHROOMIES_PROFILE_TOP=25     allocation sites per report
+    SHROOMIES_PROFILE_LIMIT=500  stop after this many samples per process
+"""
+
+import cProfile
+import functools
+import itertools
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+import shroomies
+
+DEFAULT_DIR = 'profiles'
+DEFAULT_TOP = 25
+DEFAULT_LIMIT = 500
+
+# Frames kept per allocation traceback
+TRACEMALLOC_FRAMES = 16
+
+# Public engine functions wrapped by instrument_engine()
+ENGINE_FUNCTIONS = (
+    'calculate_dose',
+    'calculate_doses',
+    'compile_plan',
+    'complete_strain',
+    'dose_curve',
+    'fuzzy_match_strain',
+    'get_strain_potency',
+    'load_strain_table',
+    'resolve_strain'
+)
+
+# Collapsed stack paths cheaper than this many microseconds are dropped
+_MIN_STACK_MICROSECONDS = 1
+
+enabled = False
+mode = None
+rate = 1.0
+output_dir = DEFAULT_DIR
+top = DEFAULT_TOP
+limit = DEFAULT_LIMIT
+
+# Only one profiler can be active per process, so samples never nest or overlap
+_active = threading.Lock()
+_samples = itertools.count(1)
+_originals = {}
+
+
+def configure(profile_mode='sample', sample_rate=1.0, directory=DEFAULT_DIR, top_allocations=DEFAULT_TOP,
+              max_samples=DEFAULT_LIMIT):
+    """
+    Turn profiling on
+    In 'sample' mode a share of reruns and engine calls is profiled; in
+    'query' mode only reruns that ask for it are
+    """
+    global enabled, mode, rate, output_dir, top, limit, _samples
+    if profile_mode not in ('sample', 'query'):
+        raise ValueError(f"Unknown profile mode '{profile_mode}'. Choose from: sample, query")
+    mode = profile_mode
+    rate = float(sample_rate)
+    output_dir = directory
+    top = int(top_allocations)
+    limit = int(max_samples)
+    _samples = itertools.count(1)
+    enabled = True
+    if mode == 'sample':
+        instrument_engine()
+    else:
+        restore_engine()
+
+
+def disable():
+    """Turn profiling off and unwrap the engine"""
+    global enabled
+    enabled = False
+    restore_engine()
+
+
+def _take_sample(requested):
+    """Whether to profile this rerun or call"""
+    if requested:
+        return True
+    return mode == 'sample' and (rate >= 1.0 or random.random() < rate)
+
+
+def collapsed_stacks(stats):
+    """
+    Convert pstats data to collapsed stacks, one 'frame;frame;... count' line
+    per call path with its self time in microseconds
+    cProfile only records caller/callee pairs, so the time reaching a
+    function along a path is split between its own time and its callees in
+    proportion to what each took overall. Recursive calls are folded into
+    the outermost frame, which keeps the total equal to the profiled time
+    Returns the lines
+    """
+    callees = {}
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((function, edge[3]))
+
+    def frame_name(function):
+        filename, line, name = function
+        if filename == '~':
+            return name.replace(';', ',')
+        return f'{os.path.basename(filename)}:{name}:{line}'.replace(';', ',')
+
+    lines = []
+
+    def walk(function, path, seconds):
+        path = path + (frame_name(function),)
+        self_seconds = stats.stats[function][2]
+        children = [(callee, edge) for callee, edge in callees.get(function, ()) if frame_name(callee) not in path]
+        weight = self_seconds + sum(edge for _, edge in children)
+        share = seconds / weight if weight else 0.0
+        microseconds = round((self_seconds * share if weight else seconds) * 1e6)
+        if microseconds >= _MIN_STACK_MICROSECONDS:
+            lines.append(f"{';'.join(path)} {microseconds}")
+        for callee, edge in children:
+            if edge * share * 1e6 >= _MIN_STACK_MICROSECONDS:
+                walk(callee, path, edge * share)
+
+    for function, (_, _, _, total_seconds, callers) in stats.stats.items():
+        if not callers:
+            walk(function, (), total_seconds)
+    return lines
+
+
+def allocation_report(snapshot, count):
+    """Top allocation sites by size, as text lines"""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    ])
+    statistics = snapshot.statistics('lineno')
+    total = sum(stat.size for stat in statistics)
+    lines = [f'{total / 1024:.1f} KiB in {sum(stat.count for stat in statistics)} blocks still allocated']
+    for stat in statistics[:count]:
+        frame = stat.traceback[0]
+        lines.append(f'{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}')
+    return lines
+
+
+def write_reports(label, profiler, snapshot, peak_bytes, seconds):
+    """
+    Write the .prof, .collapsed and .alloc.txt reports for one sample
+    Returns the common path prefix of the files written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    prefix = os.path.join(output_dir, f'{stamp}-{os.getpid()}-{label}')
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(prefix + '.prof')
+    with open(prefix + '.collapsed', 'w') as f:
+        f.writelines(line + '\n' for line in collapsed_stacks(stats))
+    with open(prefix + '.alloc.txt', 'w') as f:
+        f.write(f'{label}: {seconds * 1000:.2f} ms, peak {peak_bytes / 1024:.1f} KiB traced\n')
+        f.writelines(line + '\n' for line in allocation_report(snapshot, top))
+    return prefix
+
+
+def profile_call(label, func, *args, **kwargs):
+    """
+    Run func under cProfile and tracemalloc and write its reports
+    If another sample is in progress the call just runs unprofiled
+    """
+    if not _active.acquire(blocking=False):
+        return func(*args, **kwargs)
+    try:
+        sample = next(_samples)
+        if sample > limit:
+            return func(*args, **kwargs)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+        finally:
+            seconds = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            if not tracing:
+                tracemalloc.stop()
+            write_reports(f'{label}-{sample}', profiler, snapshot, peak_bytes, seconds)
+    finally:
+        _active.release()
+
+
+def profile_rerun(main, requested=False):
+    """
+    Run one app.main rerun, profiling it if it is sampled
+    requested is True when the page was opened with ?profile=1
+    """
+    if _take_sample(requested):
+        return profile_call('app.main', main)
+    return main()
+
+
+def profile_fragment(requested):
+    """
+    Decorator profiling sampled runs of an app fragment, as profile_rerun
+    does for app.main
+    Apply it under @st.fragment so that reruns of just the fragment are
+    covered; within a profiled app.main rerun the fragment is part of that
+    profile. requested is called on each run and returns True when the page
+    was opened with ?profile=1
+    """
+    def decorator(func):
+        label = f'app.{func.__name__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if enabled and _take_sample(requested()):
+                return profile_call(label, func, *args, **kwargs)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _wrap(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if enabled and _take_sample(False):
+            return profile_call(f'shroomies.{name}', func, *args, **kwargs)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def instrument_engine():
+    """
+    Wrap the public shroomies functions so sampled calls are profiled
+    Modules that import these names after this call get the wrappers;
+    calls made inside a profiled rerun are covered by the rerun's profile
+    """
+    for name in ENGINE_FUNCTIONS:
+        if name not in _originals:
+            _originals[name] = getattr(shroomies, name)
+            setattr(shroomies, name, _wrap(name, _originals[name]))
+
+
+def restore_engine():
+    """Undo instrument_engine()"""
+    for name, func in _originals.items():
+        setattr(shroomies, name, func)
+    _originals.clear()
+
+
+if os.environ.get('SHROOMIES_PROFILE', '0') not in ('', '0'):
+    configure(
+        'query' if os.environ['SHROOMIES_PROFILE'] == 'query' else 'sample',
+        os.environ.get('SHROOMIES_PROFILE_RATE', 1.0),
+        os.environ.get('SHROOMIES_PROFILE_DIR', DEFAULT_DIR),
+        os.environ.get('SHROOMIES_PROFILE_TOP', DEFAULT_TOP),
+        os.environ.get('SHROOMIES_PROFILE_LIMIT', DEFAULT_LIMIT)
+    )
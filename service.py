@@ -0,0 +1,221 @@
+"""
+Headless JSON API for the mushroom dose calculator
+A dependency-free ASGI application around the shroomies engine for
+machine-to-machine callers, with Prometheus metrics at /metrics when
+SHROOMIES_METRICS is set, sampled engine profiles when SHROOMIES_PROFILE
+is set and a calculation log when SHROOMIES_CALC_LOG is set; run it with
+any ASGI server, e.g. `python service.py --port 8000` (requires uvicorn,
+from the serve extra: uv sync --extra serve)
+"""
+
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+import calclog
+import metrics
+import profiling  # noqa: F401 - wraps the engine when SHROOMIES_PROFILE is set, so it comes before shroomies
+from shroomies import (
+    calculate_dose,
+    complete_strain,
+    get_available_strains,
+    get_dose_description,
+    get_strain_table
+)
+
+# Number of NDJSON result lines sent per chunk by the batch endpoint
+BATCH_CHUNK_LINES = 256
+
+JSON_HEADERS = [(b'content-type', b'application/json')]
+NDJSON_HEADERS = [(b'content-type', b'application/x-ndjson')]
+METRICS_HEADERS = [(b'content-type', b'text/plain; version=0.0.4')]
+
+# Encoded /strains response, cached per strain table
+_strains_cache = (None, b'')
+
+
+def _encode(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def calculate(request):
+    """
+    Calculate one dose from a request object
+    Returns the calculate_dose result, or {'error': message} for bad input
+    """
+    try:
+        mushroom_type = request['mushroom_type']
+        dose_level = request['dose_level']
+        weight_kg = float(request['weight_kg'])
+        result = calculate_dose(mushroom_type, dose_level, request.get('strain'), weight_kg)
+    except KeyError as e:
+        return {'error': f"Missing or unknown value: {e.args[0]}"}
+    except (TypeError, ValueError, AttributeError) as e:
+        return {'error': str(e)}
+    if calclog.enabled:
+        calclog.record(mushroom_type, dose_level, weight_kg, result)
+    return result.as_dict()
+
+
+def _strains_body():
+    """Encoded strain list, rebuilt only when the strain table changes"""
+    global _strains_cache
+    table = get_strain_table()
+    cached_table, body = _strains_cache
+    if cached_table is not table:
+        body = _encode({'strains': list(get_available_strains())})
+        _strains_cache = (table, body)
+    return body
+
+
+def _parse_batch(body):
+    """Parse a batch body given as a JSON array or as NDJSON lines"""
+    text = body.decode('utf-8').strip()
+    if text.startswith('['):
+        yield from json.loads(text)
+        return
+    for line in text.splitlines():
+        if line.strip():
+            yield json.loads(line)
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _respond(send, status, body, headers=JSON_HEADERS):
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _stream_batch(send, requests):
+    """Stream one NDJSON result line per request, in request order"""
+    await send({'type': 'http.response.start', 'status': 200, 'headers': NDJSON_HEADERS})
+    lines = []
+    for request in requests:
+        result = calculate(request) if isinstance(request, dict) else {'error': 'Request must be an object'}
+        lines.append(_encode(result))
+        if len(lines) >= BATCH_CHUNK_LINES:
+            await send({'type': 'http.response.body', 'body': b'\n'.join(lines) + b'\n', 'more_body': True})
+            lines = []
+    await send({'type': 'http.response.body', 'body': b'\n'.join(lines) + b'\n' if lines else b''})
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] == 'websocket':
+        # There are no websocket endpoints; closing before accepting rejects the handshake
+        if (await receive())['type'] == 'websocket.connect':
+            await send({'type': 'websocket.close'})
+        return
+    if scope['type'] != 'http':
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    method = scope['method']
+    path = scope['path']
+
+    if method == 'GET' and path == '/strains':
+        await _respond(send, 200, _strains_body())
+    elif method == 'GET' and path == '/strains/complete':
+        query = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+        prefix = query.get('prefix', [''])[0]
+        try:
+            limit = min(int(query.get('limit', ['5'])[0]), 50)
+        except ValueError:
+            await _respond(send, 400, _encode({'error': 'limit must be an integer'}))
+            return
+        await _respond(send, 200, _encode({'prefix': prefix, 'strains': complete_strain(prefix, limit)}))
+    elif method == 'GET' and path == '/metrics':
+        await _respond(send, 200, metrics.render().encode('utf-8'), METRICS_HEADERS)
+    elif method == 'GET' and path == '/dose-description':
+        query = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+        level = query.get('level', [''])[0]
+        await _respond(send, 200, _encode({'level': level, 'description': get_dose_description(level)}))
+    elif method == 'POST' and path == '/dose':
+        try:
+            request = json.loads(await _read_body(receive))
+        except ValueError:
+            await _respond(send, 400, _encode({'error': 'Invalid JSON'}))
+            return
+        if not isinstance(request, dict):
+            await _respond(send, 400, _encode({'error': 'Request must be an object'}))
+            return
+        result = calculate(request)
+        await _respond(send, 400 if 'error' in result else 200, _encode(result))
+    elif method == 'POST' and path == '/dose/batch':
+        try:
+            requests = list(_parse_batch(await _read_body(receive)))
+        except ValueError:
+            await _respond(send, 400, _encode({'error': 'Invalid JSON'}))
+            return
+        await _stream_batch(send, requests)
+    elif path in ('/strains', '/strains/complete', '/metrics', '/dose-description', '/dose', '/dose/batch'):
+        await _respond(send, 405, _encode({'error': 'Method not allowed'}))
+    else:
+        await _respond(send, 404, _encode({'error': 'Not found'}))
+
+
+async def request(method, path, body=b'', query_string=b''):
+    """
+    Call the app in-process without a server, e.g. from tests or scripts
+    Returns (status, headers, body)
+    """
+    if not isinstance(body, bytes):
+        body = _encode(body)
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': []
+    }
+    received = False
+    response = {'status': None, 'headers': [], 'body': b''}
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {'type': 'http.disconnect'}
+        received = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = message['headers']
+        else:
+            response['body'] += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return response['status'], response['headers'], response['body']
+
+
+def call(method, path, body=b'', query_string=b''):
+    """Synchronous wrapper around request()"""
+    return asyncio.run(request(method, path, body, query_string))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, access_log=False)
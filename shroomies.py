@@ -3,6 +3,23 @@ Mushroom dose calculation logic
 Handles different mushroom types, strains, and dosage levels
 """
 
+import csv
+import heapq
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, namedtuple
+from collections.abc import Mapping, Sequence
+from operator import itemgetter
+
+logger = logging.getLogger(__name__)
+
 # Strain potency database (psilocybin content estimates in mg per gram dried weight)
 STRAIN_POTENCIES = {
     # Popular strains with known potencies
@@ -59,37 +76,461 @@ DOSE_LEVELS = {
     'high': 4.25     # 3.5-5 grams dried (using middle value)
 }
 
+# Dried gram ranges the DOSE_LEVELS values are the middle of
+DOSE_LEVEL_RANGES = {
+    'micro': (0.1, 0.5),
+    'low': (0.5, 1.5),
+    'normal': (2.0, 3.0),
+    'high': (3.5, 5.0)
+}
+
 # Conversion factors
 FRESH_TO_DRIED_RATIO = 10  # Fresh mushrooms are ~90% water
 TRUFFLE_POTENCY_FACTOR = 0.3  # Truffles are generally 30% as potent as dried mushrooms
 
+# Mushroom forms and the weight unit reported for each (indexed by unit code)
+MUSHROOM_TYPES = ('dried', 'fresh', 'truffles')
+WEIGHT_UNITS = ('grams dried', 'grams fresh', 'grams fresh truffles')
+
+# Potency category names (indexed by potency category code)
+POTENCY_CATEGORY_NAMES = ('mild', 'standard', 'strong')
+
+# Common abbreviations and variations of strain names
+STRAIN_ALIASES = {
+    'pe': 'penis envy',
+    'ape': 'albino penis envy',
+    'gt': 'golden teacher',
+    'jmf': 'jedi mind fuck',
+    'tat': 'south african transkei',
+    'gwm': 'great white monster',
+    'nss': 'natal super strength'
+}
+
+# Minimum similarity score for a misspelled strain to resolve to a known
+# one, and how far it must score above the next closest name
+FUZZY_MATCH_THRESHOLD = 0.7
+FUZZY_MATCH_MARGIN = 0.15
+
+# Default minimum score of fuzzy_match_strain suggestions
+FUZZY_MIN_SCORE = 0.3
+
+# Work limits of one fuzzy match: posting entries read, rarest trigrams
+# first, and candidate names scored exactly
+FUZZY_MAX_POSTINGS = 5000
+FUZZY_MAX_CANDIDATES = 100
+
+# Result of resolving a strain input: potency value, canonical name,
+# whether the input named a strain in the database exactly or by alias
+# (False for fuzzy matches), its potency category name and match
+# confidence (1.0 exact, below 1.0 fuzzy, 0.0 unknown)
+StrainResolution = namedtuple('StrainResolution', ['potency', 'name', 'found', 'category', 'confidence'])
+
+
+def get_potency_category(potency):
+    """Get the display potency category for a potency value"""
+    if potency <= 6.0:
+        return 'mild'
+    elif potency >= 9.0:
+        return 'strong'
+    return 'standard'
+
+
+class CompactStrainStore(Mapping):
+    """
+    Read-only strain -> potency mapping stored in flat arrays
+    Names are kept sorted in one UTF-8 blob with an offsets array and a
+    parallel array of potencies, and looked up by binary search. This
+    takes a fraction of the memory of a dict for large catalogues.
+    """
+
+    def __init__(self, blob, offsets, potencies):
+        self.blob = blob
+        self.offsets = offsets
+        self.potencies = potencies
+        self.names = _CompactStrainNames(self)
+
+    @classmethod
+    def from_items(cls, items):
+        """Build a store from (name, potency) pairs"""
+        entries = sorted(dict(items).items())
+        blob = bytearray()
+        offsets = array('I', [0])
+        potencies = array('d')
+        for name, potency in entries:
+            blob += name.encode('utf-8')
+            offsets.append(len(blob))
+            potencies.append(potency)
+        return cls(bytes(blob), offsets, potencies)
+
+    def _name_bytes(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+    def _find(self, name):
+        """Binary search for a name, returning its position or -1"""
+        if not isinstance(name, str):
+            return -1
+        target = name.encode('utf-8')
+        lo, hi = 0, len(self.potencies)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.potencies) and self._name_bytes(lo) == target:
+            return lo
+        return -1
+
+    def __getitem__(self, name):
+        i = self._find(name)
+        if i < 0:
+            raise KeyError(name)
+        return self.potencies[i]
+
+    def __contains__(self, name):
+        return self._find(name) >= 0
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.potencies)
+
+
+class _CompactStrainNames(Sequence):
+    """Sorted strain names of a CompactStrainStore, decoded on access"""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._store._name_bytes(i).decode('utf-8')
+
+    def __len__(self):
+        return len(self._store)
+
+
+def _build_strain_index(strain_potencies, potency_categories, aliases):
+    """
+    Merge potency categories, aliases and strains into one lookup
+    keyed by the lowercased, stripped input
+    Strains in a CompactStrainStore are left out and looked up in the store
+    """
+    index = {}
+    strains = () if isinstance(strain_potencies, CompactStrainStore) else strain_potencies
+    for key in (*strains, *aliases, *potency_categories):
+        name = aliases.get(key, key)
+        found = name in strain_potencies
+        if key in potency_categories:
+            potency = potency_categories[key]
+        elif found:
+            potency = strain_potencies[name]
+        else:
+            potency = potency_categories['standard']
+        index[key] = StrainResolution(potency, name, found, get_potency_category(potency), 1.0)
+    return index
+
+
+def _trigrams(text):
+    """Get the set of character trigrams of a padded name"""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _build_fuzzy_index(keys):
+    """
+    Build a trigram inverted index over lookup keys
+    Returns the keys, their trigram counts and trigram -> key ids postings
+    """
+    sizes = array('H')
+    postings = {}
+    for key_id, key in enumerate(keys):
+        grams = _trigrams(key)
+        sizes.append(len(grams))
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('I')
+            posting.append(key_id)
+    return keys, sizes, postings
+
+
+def _build_completion_index(table):
+    """
+    Build the prefix search tiers for strain name completion
+    Returns (keys, names) pairs in rank order: full strain names, aliases
+    of known strains, then words inside multi-word names. Keys are sorted
+    for binary search; names is None where each key is its own name
+    """
+    aliases = sorted(
+        (alias, name) for alias, name in table.aliases.items() if name in table.strain_potencies
+    )
+    if table._completion_words is not None:
+        words = table._completion_words
+    else:
+        words = sorted(
+            (name[i + 1:], name)
+            for name in table.strain_names
+            for i, char in enumerate(name) if char == ' '
+        )
+        words = (tuple(word for word, _ in words), tuple(name for _, name in words))
+    return (
+        (table.strain_names, None),
+        (tuple(alias for alias, _ in aliases), tuple(name for _, name in aliases)),
+        words
+    )
+
+
+class _ChainedNames(Sequence):
+    """Read-only concatenation of two name sequences"""
+
+    def __init__(self, first, second):
+        self._first = first
+        self._second = second
+
+    def __getitem__(self, i):
+        if i < len(self._first):
+            return self._first[i]
+        return self._second[i - len(self._first)]
+
+    def __len__(self):
+        return len(self._first) + len(self._second)
+
+
+class StrainTable:
+    """
+    Snapshot of the strain database and its lookup indexes
+    Tables are never modified after construction; reloading builds a new
+    table and swaps the module reference, so a calculation that grabbed a
+    table keeps a consistent view for its whole duration
+    """
+
+    def __init__(self, strain_potencies, potency_categories, aliases, source=None, fuzzy_postings=None,
+                 completion_words=None):
+        self.strain_potencies = strain_potencies
+        self.potency_categories = potency_categories
+        self.aliases = aliases
+        self.source = source
+        self.compact = isinstance(strain_potencies, CompactStrainStore)
+        self.index = _build_strain_index(self.strain_potencies, self.potency_categories, self.aliases)
+        self.standard_potency = self.potency_categories['standard']
+        if self.compact:
+            self.strain_names = strain_potencies.names
+        else:
+            self.strain_names = tuple(sorted(strain_potencies))
+        self._fuzzy_index = None
+        self._completion_index = None
+        self._lazy_lock = threading.Lock()
+        # Prebuilt index parts, e.g. for a table shared between processes:
+        # the fuzzy index's (sizes, postings) and the completion index's
+        # (words, names) tier
+        self._fuzzy_postings = fuzzy_postings
+        self._completion_words = completion_words
+
+    def lookup(self, key):
+        """Get the StrainResolution for an exact lookup key, or None"""
+        resolution = self.index.get(key)
+        if resolution is None and self.compact:
+            potency = self.strain_potencies.get(key)
+            if potency is not None:
+                resolution = StrainResolution(potency, key, True, get_potency_category(potency), 1.0)
+        return resolution
+
+    @property
+    def fuzzy_index(self):
+        """Trigram index, built on first use so large tables load quickly"""
+        if self._fuzzy_index is None:
+            with self._lazy_lock:
+                if self._fuzzy_index is None:
+                    keys = tuple(self.index)
+                    if self.compact:
+                        keys = _ChainedNames(keys, self.strain_names)
+                    if self._fuzzy_postings is not None:
+                        self._fuzzy_index = (keys, *self._fuzzy_postings)
+                    else:
+                        self._fuzzy_index = _build_fuzzy_index(keys)
+        return self._fuzzy_index
+
+    @property
+    def completion_index(self):
+        """Sorted prefix search tiers, built on first use"""
+        if self._completion_index is None:
+            with self._lazy_lock:
+                if self._completion_index is None:
+                    self._completion_index = _build_completion_index(self)
+        return self._completion_index
+
+
+_BUILTIN_STRAIN_TABLE = StrainTable(STRAIN_POTENCIES, POTENCY_CATEGORIES, STRAIN_ALIASES)
+_strain_table = _BUILTIN_STRAIN_TABLE
+
+
+def get_strain_table():
+    """Get the strain table currently used for calculations"""
+    return _strain_table
+
+
+def set_strain_table(table):
+    """Atomically replace the strain table used for calculations"""
+    global _strain_table, STRAIN_POTENCIES, POTENCY_CATEGORIES, STRAIN_ALIASES
+    _strain_table = table
+    STRAIN_POTENCIES = table.strain_potencies
+    POTENCY_CATEGORIES = table.potency_categories
+    STRAIN_ALIASES = table.aliases
+    clear_dose_cache()
+    clear_dose_curves()
+
+
+def _fuzzy_match(table, query, limit, min_score):
+    """
+    Score the names most similar to the query against one table
+    A name scoring at least min_score shares at least `needed` trigrams
+    with the query, so it appears in the postings of one of the query's
+    len(grams) - needed + 1 rarest trigrams. Only those postings are read,
+    up to FUZZY_MAX_POSTINGS entries, and the FUZZY_MAX_CANDIDATES names
+    seen most often there are scored against the remaining trigrams'
+    sorted postings by binary search
+    """
+    keys, sizes, postings = table.fuzzy_index
+    grams = _trigrams(query)
+    count = len(grams)
+    # Dice >= min_score bounds both the shared trigrams and the name's size
+    needed = max(1, math.ceil(min_score * count / (2 - min_score) - 1e-9))
+    max_size = count * (2 - min_score) / min_score if min_score > 0 else math.inf
+    lists = sorted((postings.get(gram, ()) for gram in grams), key=len)
+
+    shared = Counter()
+    budget = FUZZY_MAX_POSTINGS
+    scanned = 0
+    for posting in lists[:count - needed + 1]:
+        # Lists are sorted by length, so the rest are too common to read
+        if len(posting) > budget:
+            break
+        budget -= len(posting)
+        scanned += 1
+        shared.update(posting)
+    candidates = shared.items()
+    if len(shared) > FUZZY_MAX_CANDIDATES:
+        candidates = heapq.nlargest(FUZZY_MAX_CANDIDATES, candidates, key=itemgetter(1))
+    candidates = [(key_id, hits) for key_id, hits in candidates if needed <= sizes[key_id] <= max_size]
+
+    # Dice coefficient, keeping the best score per canonical name
+    rest = lists[scanned:]
+    best = {}
+    for key_id, hits in candidates:
+        for posting in rest:
+            i = bisect_left(posting, key_id)
+            if i < len(posting) and posting[i] == key_id:
+                hits += 1
+        score = 2 * hits / (count + sizes[key_id])
+        if score < min_score:
+            continue
+        name = table.lookup(keys[key_id]).name
+        if score > best.get(name, 0.0):
+            best[name] = score
+    ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+    return [(name, round(score, 3)) for name, score in ranked[:limit]]
+
+
+def fuzzy_match_strain(strain_input, limit=3, min_score=FUZZY_MIN_SCORE):
+    """
+    Find the closest known strains or potency categories for a misspelled name
+    Reads a bounded number of trigram postings, rarest first, and scores a
+    bounded number of candidates, so the work per call is capped however
+    large the database is; names scoring below min_score are left out
+
+    Returns:
+        list of (canonical name, score) pairs, best first, scores in 0-1
+    """
+    if not strain_input:
+        return []
+    return _fuzzy_match(_strain_table, strain_input.lower().strip(), limit, min_score)
+
+
+def _complete(table, prefix, limit):
+    """Find up to limit strain names matching a prefix in one table"""
+    matches = []
+    for keys, names in table.completion_index:
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and len(matches) < limit:
+            key = keys[i]
+            if not key.startswith(prefix):
+                break
+            name = key if names is None else names[i]
+            if name not in matches:
+                matches.append(name)
+            i += 1
+        if len(matches) >= limit:
+            break
+    return matches
+
+
+def complete_strain(prefix, limit=5):
+    """
+    Suggest strain names for a partially typed input
+    Names starting with the prefix rank first, then strains with a
+    matching alias, then names with a later word starting with it, each
+    alphabetically. Each tier is a binary search, so the cost depends on
+    limit rather than the size of the database
+
+    Returns:
+        list of canonical strain names, best first
+    """
+    if not prefix or not prefix.strip():
+        return []
+    return _complete(_strain_table, prefix.lower().lstrip(), limit)
+
+
+def _resolve(table, strain_input):
+    """Resolve a strain input against one table"""
+    if not strain_input:
+        return StrainResolution(table.standard_potency, None, False, 'standard', 0.0)
+
+    key = strain_input.lower().strip()
+    resolution = table.lookup(key)
+    if resolution is not None:
+        return resolution
+
+    # Expand abbreviations used inside longer names, e.g. "albino pe"
+    expanded = ' '.join(table.aliases.get(word, word) for word in key.split())
+    resolution = table.lookup(expanded)
+    if resolution is not None:
+        return resolution
+
+    # Fall back to the closest known name for misspellings, unless another
+    # name scores nearly as well or the input begins several names
+    # (e.g. "golden"), where picking one would be a guess
+    matches = _fuzzy_match(table, expanded, 2, FUZZY_MATCH_THRESHOLD - FUZZY_MATCH_MARGIN)
+    if matches and matches[0][1] >= FUZZY_MATCH_THRESHOLD:
+        name, score = matches[0]
+        runner_up = matches[1][1] if len(matches) > 1 else 0.0
+        if score - runner_up >= FUZZY_MATCH_MARGIN and len(_complete(table, expanded, 2)) < 2:
+            return table.lookup(name)._replace(found=False, confidence=score)
+    return StrainResolution(table.standard_potency, key, False, 'standard', 0.0)
+
+
+def resolve_strain(strain_input):
+    """
+    Resolve a strain name or potency category in a single lookup
+    Misspelled names resolve to the clearly closest known name with
+    found False and a confidence below 1.0; unknown or ambiguous strains
+    get standard potency
+    """
+    return _resolve(_strain_table, strain_input)
+
 
 def normalize_strain_name(strain_name):
     """
     Normalize strain name for lookup
     Handles spaces, capitalization, and common variations
     """
-    if not strain_name:
-        return None
-    
-    # Convert to lowercase and strip whitespace
-    normalized = strain_name.lower().strip()
-    
-    # Handle common abbreviations and variations
-    variations = {
-        'pe': 'penis envy',
-        'ape': 'albino penis envy',
-        'gt': 'golden teacher',
-        'jmf': 'jedi mind fuck',
-        'tat': 'south african transkei',
-        'gwm': 'great white monster',
-        'nss': 'natal super strength'
-    }
-    
-    if normalized in variations:
-        return variations[normalized]
-    
-    return normalized
+    return _resolve(_strain_table, strain_name).name
 
 
 def get_strain_potency(strain_input):
@@ -97,22 +538,207 @@ def get_strain_potency(strain_input):
     Get potency value for a given strain or potency category
     Returns potency in mg psilocybin per gram dried weight
     """
-    if not strain_input:
-        return POTENCY_CATEGORIES['standard']
-    
-    strain_lower = strain_input.lower().strip()
-    
-    # Check if it's a potency category
-    if strain_lower in POTENCY_CATEGORIES:
-        return POTENCY_CATEGORIES[strain_lower]
-    
-    # Check if it's a specific strain
-    normalized_strain = normalize_strain_name(strain_input)
-    if normalized_strain and normalized_strain in STRAIN_POTENCIES:
-        return STRAIN_POTENCIES[normalized_strain]
-    
-    # Default to standard potency if strain not found
-    return POTENCY_CATEGORIES['standard']
+    return _resolve(_strain_table, strain_input).potency
+
+
+def _normalize_strain_rows(rows):
+    """Build a strain -> potency dict from (name, potency) rows"""
+    strain_potencies = {}
+    for name, potency in rows:
+        name = str(name).lower().strip()
+        if name:
+            strain_potencies[name] = float(potency)
+    return strain_potencies
+
+
+def load_strain_table(path, compact=None):
+    """
+    Load a strain table from a JSON, CSV or SQLite file
+
+    JSON files hold either a {name: potency} object or an object with
+    "strains" and optional "categories" and "aliases" objects. CSV files
+    have "name" and "potency" columns. SQLite files have a
+    strains(name, potency) table and an optional aliases(alias, name) table.
+    Categories and aliases not given in the file keep their built-in values.
+    With compact (default: SHROOMIES_STRAIN_STORE=compact) the strains are
+    kept in a CompactStrainStore instead of a dict.
+    """
+    if compact is None:
+        compact = os.environ.get('SHROOMIES_STRAIN_STORE') == 'compact'
+    suffix = os.path.splitext(path)[1].lower()
+    potency_categories = None
+    aliases = None
+
+    if suffix == '.json':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if 'strains' in data:
+            potency_categories = data.get('categories')
+            aliases = data.get('aliases')
+            data = data['strains']
+        strain_potencies = _normalize_strain_rows(data.items())
+    elif suffix == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            strain_potencies = _normalize_strain_rows(
+                (row['name'], row['potency']) for row in csv.DictReader(f)
+            )
+    elif suffix in ('.db', '.sqlite', '.sqlite3'):
+        connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            strain_potencies = _normalize_strain_rows(
+                connection.execute('SELECT name, potency FROM strains')
+            )
+            has_aliases = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'aliases'"
+            ).fetchone()
+            if has_aliases:
+                aliases = dict(connection.execute('SELECT alias, name FROM aliases'))
+        finally:
+            connection.close()
+    else:
+        raise ValueError(f"Unsupported strain database format: {path}")
+
+    if potency_categories is None:
+        potency_categories = _BUILTIN_STRAIN_TABLE.potency_categories
+    if aliases is None:
+        aliases = _BUILTIN_STRAIN_TABLE.aliases
+    else:
+        aliases = {alias.lower().strip(): name.lower().strip() for alias, name in aliases.items()}
+    if compact:
+        strain_potencies = CompactStrainStore.from_items(strain_potencies.items())
+    return StrainTable(strain_potencies, potency_categories, aliases, source=path)
+
+
+def _file_signature(path):
+    """Cheap change-detection signature for a file"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def watch_strain_db(path, interval=30.0):
+    """
+    Load the strain table from path and reload it whenever the file changes
+    The file is checked every interval seconds from a background thread;
+    reloaded tables are fully indexed before being swapped in and a failed
+    reload keeps serving the previous table
+    """
+    signature = _file_signature(path)
+    table = load_strain_table(path)
+    set_strain_table(table)
+
+    def watch():
+        nonlocal signature, table
+        table.fuzzy_index
+        table.completion_index
+        # Let the table be freed once a reload replaces it
+        table = None
+        while True:
+            time.sleep(interval)
+            try:
+                current = _file_signature(path)
+                if current != signature:
+                    new_table = load_strain_table(path)
+                    new_table.fuzzy_index
+                    new_table.completion_index
+                    set_strain_table(new_table)
+                    signature = current
+            except Exception:
+                logger.exception("Failed to reload strain database %s", path)
+
+    thread = threading.Thread(target=watch, name='strain-db-watcher', daemon=True)
+    thread.start()
+    return thread
+
+
+_POTENCY_CATEGORY_CODES = {name: code for code, name in enumerate(POTENCY_CATEGORY_NAMES)}
+
+# Keys of the dict-style view of a DoseResult
+DOSE_RESULT_KEYS = ('dose_grams', 'weight_unit', 'potency_category', 'strain_found',
+                    'normalized_strain', 'weight_factor', 'match_confidence')
+_DOSE_RESULT_KEY_SET = frozenset(DOSE_RESULT_KEYS)
+
+
+class DoseResult(Mapping):
+    """
+    Result of calculate_dose
+    Weight unit and potency category are stored as codes into WEIGHT_UNITS
+    and POTENCY_CATEGORY_NAMES. Results read like the dicts calculate_dose
+    used to return: indexing by key, get(), iteration over DOSE_RESULT_KEYS,
+    len(), dict(result), 'dose_grams' in result and == with a dict all work.
+    json.dumps() only takes real dicts, so serialize result.as_dict().
+    Results are immutable, so the dose cache can share them between callers
+    """
+
+    __slots__ = ('dose_grams', 'unit_code', 'category_code', 'strain_found',
+                 'normalized_strain', 'weight_factor', 'match_confidence')
+
+    def __new__(cls, dose_grams, unit_code, category_code, strain_found, normalized_strain, weight_factor,
+                match_confidence):
+        # Filled in as a writable subclass with the same slots, then switched
+        # over, which is cheaper than seven object.__setattr__ calls
+        self = object.__new__(_DoseResultBuilder)
+        self.dose_grams = dose_grams
+        self.unit_code = unit_code
+        self.category_code = category_code
+        self.strain_found = strain_found
+        self.normalized_strain = normalized_strain
+        self.weight_factor = weight_factor
+        self.match_confidence = match_confidence
+        self.__class__ = cls
+        return self
+
+    @property
+    def weight_unit(self):
+        return WEIGHT_UNITS[self.unit_code]
+
+    @property
+    def potency_category(self):
+        return POTENCY_CATEGORY_NAMES[self.category_code]
+
+    def __getitem__(self, key):
+        if key in _DOSE_RESULT_KEY_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(DOSE_RESULT_KEYS)
+
+    def __len__(self):
+        return len(DOSE_RESULT_KEYS)
+
+    def __contains__(self, key):
+        return key in _DOSE_RESULT_KEY_SET
+
+    def get(self, key, default=None):
+        if key in _DOSE_RESULT_KEY_SET:
+            return getattr(self, key)
+        return default
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"DoseResult is immutable; cannot set '{name}'")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"DoseResult is immutable; cannot delete '{name}'")
+
+    def __reduce__(self):
+        return DoseResult, tuple(getattr(self, name) for name in DoseResult.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in DoseResult.__slots__)
+        return f'DoseResult({fields})'
+
+    def as_dict(self):
+        """Get the result as a plain dict"""
+        return {key: getattr(self, key) for key in DOSE_RESULT_KEYS}
+
+
+class _DoseResultBuilder(DoseResult):
+    """DoseResult whose fields can be set, used only while DoseResult.__new__ fills one in"""
+
+    __slots__ = ()
+
+    __setattr__ = object.__setattr__
+    __delattr__ = object.__delattr__
 
 
 def get_weight_factor(weight_kg):
@@ -136,6 +762,102 @@ def get_weight_factor(weight_kg):
         return 1.0 + (weight_kg - 250) * (1.3 - 1.0) / (400 - 250)
 
 
+# Weight factor curve of get_weight_factor as (start kg, end kg, factor at
+# start, factor at end) segments; the factor is clamped outside them
+WEIGHT_CURVE = (
+    (80, 115, 0.8, 1.0),
+    (115, 250, 1.0, 1.0),
+    (250, 400, 1.0, 1.3)
+)
+
+
+def milli(value):
+    """Convert a value to integer thousandths, e.g. grams to milligrams"""
+    return int(round(value * 1000))
+
+
+# Fixed-point dose kernel. calculate_dose, calculate_doses and DosePlan
+# work from these integer tables: dose levels in milligrams, potencies and
+# weight factors in thousandths, body weight in whole grams and the dose
+# coefficient in micrograms. Every step is exact integer arithmetic with
+# one round-half-even division, so any implementation using the same
+# tables gets bit-identical doses (index.html uses the copies that
+# build_static.py exports). All intermediate values stay below 2**53.
+
+# Dose levels in milligrams dried
+FIXED_DOSE_LEVELS_MG = {level: milli(grams) for level, grams in DOSE_LEVELS.items()}
+
+
+def _reduce(*values):
+    divisor = math.gcd(*values)
+    return tuple(value // divisor for value in values)
+
+
+# Dried to weight unit conversion as a (numerator, denominator) pair, indexed by unit code
+FIXED_FORM_RATIOS = (
+    (1, 1),
+    (FRESH_TO_DRIED_RATIO, 1),
+    _reduce(FRESH_TO_DRIED_RATIO * 1000, milli(TRUFFLE_POTENCY_FACTOR))
+)
+
+# WEIGHT_CURVE as (start grams, end grams, base, slope, denominator); the
+# factor at weight w grams in a segment is (base + slope * (w - start)) / denominator
+FIXED_WEIGHT_SEGMENTS = tuple(
+    (start * 1000, end * 1000, *_reduce(
+        milli(factor_start) * (end - start) * 1000,
+        milli(factor_end) - milli(factor_start),
+        1000 * (end - start) * 1000
+    ))
+    for start, end, factor_start, factor_end in WEIGHT_CURVE
+)
+
+_FIXED_MIN_KG = WEIGHT_CURVE[0][0]
+_FIXED_MAX_KG = WEIGHT_CURVE[-1][1]
+
+# Dose level milligrams times the form numerator, in micrograms, by dose level and unit code
+_FIXED_DOSE_NUMERATORS = {
+    level: tuple(level_mg * 1000 * numerator for numerator, _ in FIXED_FORM_RATIOS)
+    for level, level_mg in FIXED_DOSE_LEVELS_MG.items()
+}
+
+_MUSHROOM_TYPE_CODES = {name: code for code, name in enumerate(MUSHROOM_TYPES)}
+
+
+def _div_round(numerator, denominator):
+    """Divide non-negative integers, rounding halves to even like round()"""
+    quotient, remainder = divmod(numerator, denominator)
+    if 2 * remainder > denominator or (2 * remainder == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def _fixed_coefficient(dose_numerators, unit_code, potency, standard_potency):
+    """Dose in micrograms at a weight factor of 1"""
+    return _div_round(
+        dose_numerators[unit_code] * milli(potency),
+        milli(standard_potency) * FIXED_FORM_RATIOS[unit_code][1]
+    )
+
+
+# Error for a NaN body weight, which has no place on the weight curve
+WEIGHT_NAN_ERROR = 'weight_kg must be a number'
+
+_FIXED_SEGMENT_ENDS = [end for _, end, _, _, _ in FIXED_WEIGHT_SEGMENTS]
+
+
+def _fixed_dose(coefficient, weight_kg):
+    """Dose in centigrams for a coefficient in micrograms and a body weight"""
+    if weight_kg < _FIXED_MIN_KG:
+        weight_kg = _FIXED_MIN_KG
+    elif weight_kg > _FIXED_MAX_KG:
+        weight_kg = _FIXED_MAX_KG
+    elif weight_kg != weight_kg:
+        raise ValueError(WEIGHT_NAN_ERROR)
+    weight_g = math.floor(weight_kg * 1000 + 0.5)
+    start, _, base, slope, denominator = FIXED_WEIGHT_SEGMENTS[bisect_left(_FIXED_SEGMENT_ENDS, weight_g)]
+    return _div_round(coefficient * (base + slope * (weight_g - start)), denominator * 10000)
+
+
 def calculate_dose(mushroom_type, dose_level, strain_input, weight_kg):
     """
     Calculate mushroom dose based on parameters
@@ -147,61 +869,451 @@ def calculate_dose(mushroom_type, dose_level, strain_input, weight_kg):
         weight_kg: user body weight in kilograms
     
     Returns:
-        dict with dose information
+        DoseResult with dose information
     """
-    # Get base dose in grams dried
-    base_dose_dried = DOSE_LEVELS[dose_level]
+    if _observer is not None:
+        return _observer(_calculate_dose_entry, mushroom_type, dose_level, strain_input, weight_kg)
+    if _dose_cache is not None:
+        return _dose_cache.calculate(mushroom_type, dose_level, strain_input, weight_kg)
+    return _calculate_dose(_strain_table, mushroom_type, dose_level, strain_input, weight_kg)
+
+
+def _calculate_dose_entry(mushroom_type, dose_level, strain_input, weight_kg):
+    """calculate_dose without the observer hook"""
+    if _dose_cache is not None:
+        return _dose_cache.calculate(mushroom_type, dose_level, strain_input, weight_kg)
+    return _calculate_dose(_strain_table, mushroom_type, dose_level, strain_input, weight_kg)
+
+
+# Hook wrapping calculate_dose calls, used for instrumentation
+_observer = None
+
+
+def set_observer(observer):
+    """
+    Install a hook around calculate_dose, or remove it with None
+    The hook is called as observer(calculate, mushroom_type, dose_level,
+    strain_input, weight_kg) and must return calculate(...)'s result
+    """
+    global _observer
+    _observer = observer
+
+
+def _calculate_dose(table, mushroom_type, dose_level, strain_input, weight_kg):
+    """Calculate one dose against a strain table with the fixed-point kernel"""
+    dose_numerators = _FIXED_DOSE_NUMERATORS[dose_level]
     
-    # Apply weight adjustment with bell curve
-    weight_factor = get_weight_factor(weight_kg)
-    adjusted_dose_dried = base_dose_dried * weight_factor
+    # Resolve strain potency and its category for display
+    strain = _resolve(table, strain_input)
     
-    # Get strain potency category for display
-    strain_potency_value = get_strain_potency(strain_input)
-    if strain_potency_value <= 6.0:
-        potency_category = 'mild'
-    elif strain_potency_value >= 9.0:
-        potency_category = 'strong'
-    else:
-        potency_category = 'standard'
+    unit_code = _MUSHROOM_TYPE_CODES.get(mushroom_type)
+    if unit_code is None:
+        raise ValueError(f"Unknown mushroom type: {mushroom_type}")
     
-    # Apply potency adjustment
-    potency_factor = strain_potency_value / POTENCY_CATEGORIES['standard']  # 7.0 is standard
-    final_dose_dried = adjusted_dose_dried * potency_factor
+    # Dose level, potency ratio and form conversion, then the weight curve
+    coefficient = _fixed_coefficient(dose_numerators, unit_code, strain.potency, table.standard_potency)
+    dose_centigrams = _fixed_dose(coefficient, weight_kg)
     
-    # Convert based on mushroom type
+    return DoseResult(
+        dose_centigrams / 100,
+        unit_code,
+        _POTENCY_CATEGORY_CODES[strain.category],
+        strain.found,
+        strain.name or strain_input,
+        round(get_weight_factor(weight_kg), 2),
+        strain.confidence
+    )
+
+
+def float_dose(mushroom_type, dose_level, strain_input, weight_kg):
+    """
+    Unrounded dose computed in floating point, for checking the kernel
+    This is the original calculate_dose formula; calculate_dose rounds it
+    to the same 0.01 except where it lies within float error of a rounding
+    boundary
+    """
+    table = _strain_table
+    adjusted_dose_dried = DOSE_LEVELS[dose_level] * get_weight_factor(weight_kg)
+    final_dose_dried = adjusted_dose_dried * (_resolve(table, strain_input).potency / table.standard_potency)
     if mushroom_type == 'fresh':
-        final_weight = final_dose_dried * FRESH_TO_DRIED_RATIO
-        weight_unit = 'grams fresh'
+        return final_dose_dried * FRESH_TO_DRIED_RATIO
+    if mushroom_type == 'dried':
+        return final_dose_dried
+    if mushroom_type == 'truffles':
+        return (final_dose_dried / TRUFFLE_POTENCY_FACTOR) * FRESH_TO_DRIED_RATIO
+    raise ValueError(f"Unknown mushroom type: {mushroom_type}")
+
+
+class DosePlan:
+    """
+    Precompiled dose calculation for a fixed form, dose level and strain
+    The dose level, potency ratio and form conversion are folded into one
+    coefficient (in grams, and in micrograms for the fixed-point kernel),
+    so evaluating a weight is a clamp, one multiply and one division.
+    Results match calculate_dose. Plans keep the strain data they were
+    compiled with.
+    """
+
+    __slots__ = ('mushroom_type', 'dose_level', 'strain', 'weight_unit', 'coefficient', 'fixed_coefficient')
+
+    def __init__(self, mushroom_type, dose_level, strain, weight_unit, coefficient, fixed_coefficient):
+        self.mushroom_type = mushroom_type
+        self.dose_level = dose_level
+        self.strain = strain
+        self.weight_unit = weight_unit
+        self.coefficient = coefficient
+        self.fixed_coefficient = fixed_coefficient
+
+    def evaluate(self, weight_kg):
+        """Get the dose in weight_unit for a body weight in kilograms"""
+        return _fixed_dose(self.fixed_coefficient, weight_kg) / 100
+
+    def __repr__(self):
+        return (f"DosePlan({self.mushroom_type!r}, {self.dose_level!r}, {self.strain.name!r}, "
+                f"coefficient={self.coefficient!r})")
+
+
+def compile_plan(mushroom_type, dose_level, strain_input):
+    """
+    Compile a DosePlan for evaluating many weights with the same inputs
+    
+    Args:
+        mushroom_type: 'fresh', 'dried', or 'truffles'
+        dose_level: 'micro', 'low', 'normal', or 'high'
+        strain_input: strain name or potency category
+    """
+    table = _strain_table
+    base_dose_dried = DOSE_LEVELS[dose_level]
+    strain = _resolve(table, strain_input)
+    dose_dried = base_dose_dried * (strain.potency / table.standard_potency)
+
+    if mushroom_type == 'fresh':
+        coefficient = dose_dried * FRESH_TO_DRIED_RATIO
     elif mushroom_type == 'dried':
-        final_weight = final_dose_dried
-        weight_unit = 'grams dried'
+        coefficient = dose_dried
     elif mushroom_type == 'truffles':
-        # Truffles are less potent and measured fresh
-        final_weight = (final_dose_dried / TRUFFLE_POTENCY_FACTOR) * FRESH_TO_DRIED_RATIO
-        weight_unit = 'grams fresh truffles'
+        coefficient = dose_dried / TRUFFLE_POTENCY_FACTOR * FRESH_TO_DRIED_RATIO
     else:
         raise ValueError(f"Unknown mushroom type: {mushroom_type}")
+
+    unit_code = _MUSHROOM_TYPE_CODES[mushroom_type]
+    fixed_coefficient = _fixed_coefficient(
+        _FIXED_DOSE_NUMERATORS[dose_level], unit_code, strain.potency, table.standard_potency
+    )
+    return DosePlan(mushroom_type, dose_level, strain, WEIGHT_UNITS[unit_code], coefficient, fixed_coefficient)
+
+
+# Dose cache statistics, like functools.lru_cache's cache_info()
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class _DoseCache:
+    """
+    Bounded LRU cache of calculate_dose results with an optional TTL
+    Keys use the normalized strain input and the weight rounded to
+    weight_step, and entries are dropped when the strain table changes.
+    Results are immutable DoseResults, so they are shared between callers
+    """
+
+    def __init__(self, maxsize, ttl, weight_step):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.weight_step = weight_step
+        self.table = _strain_table
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.table = _strain_table
+
+    def info(self):
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self.entries))
+
+    def calculate(self, mushroom_type, dose_level, strain_input, weight_kg):
+        # NaN is left for _calculate_dose to reject
+        if self.weight_step and weight_kg == weight_kg:
+            weight_kg = round(weight_kg / self.weight_step) * self.weight_step
+        strain_key = (strain_input.lower().strip() or strain_input) if strain_input else strain_input
+        key = (mushroom_type, dose_level, strain_key, weight_kg)
+        table = _strain_table
+        now = time.monotonic() if self.ttl else None
+
+        with self.lock:
+            if self.table is not table:
+                self.entries.clear()
+                self.table = table
+            entry = self.entries.get(key)
+            if entry is not None and (now is None or entry[0] > now):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        result = _calculate_dose(table, mushroom_type, dose_level, strain_input, weight_kg)
+        expires = now + self.ttl if self.ttl else None
+
+        with self.lock:
+            if self.table is table:
+                self.entries[key] = (expires, result)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+
+_dose_cache = None
+
+
+def enable_dose_cache(maxsize=4096, ttl=None, weight_step=None):
+    """
+    Cache calculate_dose results
     
-    # Determine if strain was found in database
-    normalized_strain = normalize_strain_name(strain_input)
-    strain_found = normalized_strain and normalized_strain in STRAIN_POTENCIES
-    
+    Args:
+        maxsize: maximum number of cached results
+        ttl: seconds a result stays valid, or None to keep until evicted
+        weight_step: round weights to this many kg before calculating
+            (e.g. 1.0 for whole kilograms), or None to use exact weights
+    """
+    global _dose_cache
+    _dose_cache = _DoseCache(maxsize, ttl, weight_step)
+
+
+def disable_dose_cache():
+    """Stop caching calculate_dose results and drop the cache"""
+    global _dose_cache
+    _dose_cache = None
+
+
+def clear_dose_cache():
+    """Drop all cached results, keeping the statistics"""
+    if _dose_cache is not None:
+        _dose_cache.clear()
+
+
+def dose_cache_info():
+    """Get dose cache statistics, or None when caching is disabled"""
+    if _dose_cache is None:
+        return None
+    return _dose_cache.info()
+
+
+def _round_array(np, values, ndigits):
+    """
+    Round an array exactly like the builtin round()
+    np.round only disagrees with round() when the scaled value sits on a
+    half boundary, so those few elements are re-rounded in Python
+    """
+    rounded = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in ties:
+        rounded.flat[i] = round(float(values.flat[i]), ndigits)
+    return rounded
+
+
+def _div_round_array(np, numerators, denominators):
+    """Vectorized _div_round"""
+    quotients, remainders = np.divmod(numerators, denominators)
+    return quotients + ((2 * remainders > denominators) | ((2 * remainders == denominators) & (quotients % 2 == 1)))
+
+
+def _weight_factor_array(np, weights):
+    """Vectorized get_weight_factor with the same operation order"""
+    return np.select(
+        [(weights >= 115) & (weights <= 250), weights <= 80, weights < 115, weights >= 400],
+        [1.0, 0.8, 0.8 + (weights - 80) * (1.0 - 0.8) / (115 - 80), 1.3],
+        default=1.0 + (weights - 250) * (1.3 - 1.0) / (400 - 250)
+    )
+
+
+def _codes(np, values, choices):
+    """Map an array of strings to indexes into choices, returning unknown values"""
+    # One vectorized comparison per choice; sorting the strings to find the
+    # distinct values costs far more than a handful of comparisons
+    codes = np.full(values.shape, -1, dtype=np.intp)
+    for code, name in enumerate(choices):
+        codes[values == name] = code
+    unknown = values[codes < 0]
+    return codes, [str(value) for value in unknown[:1]]
+
+
+def _factorize(np, values):
+    """
+    Number the distinct values of an array in order of first appearance
+    Returns the codes, shaped like values, and the distinct values
+    """
+    items = values.ravel().tolist()
+    distinct = list(dict.fromkeys(items))
+    index = {value: code for code, value in enumerate(distinct)}
+    codes = np.fromiter(map(index.__getitem__, items), dtype=np.intp, count=len(items))
+    return codes.reshape(values.shape), distinct
+
+
+def calculate_doses(mushroom_types, dose_levels, strain_inputs, weights_kg):
+    """
+    Calculate doses for many rows at once
+    Arguments are NumPy arrays, sequences or scalars and are broadcast
+    together; results match calculate_dose row for row
+
+    Args:
+        mushroom_types: 'fresh', 'dried', or 'truffles' per row
+        dose_levels: 'micro', 'low', 'normal', or 'high' per row
+        strain_inputs: strain name or potency category per row
+        weights_kg: user body weight in kilograms per row
+
+    Returns:
+        dict of arrays: dose_grams, unit_code (index into WEIGHT_UNITS),
+        potency_category_code (index into POTENCY_CATEGORY_NAMES),
+        strain_found, weight_factor and match_confidence
+    """
+    import numpy as np
+
+    types, levels, strains, weights = np.broadcast_arrays(
+        np.asarray(mushroom_types, dtype=str),
+        np.asarray(dose_levels, dtype=str),
+        # Strains are only factorized, so lists skip the conversion to a string array
+        strain_inputs if isinstance(strain_inputs, np.ndarray) else np.asarray(strain_inputs, dtype=object),
+        np.asarray(weights_kg, dtype=np.float64)
+    )
+
+    level_codes, unknown = _codes(np, levels, tuple(DOSE_LEVELS))
+    if unknown:
+        raise KeyError(unknown[0])
+
+    # Weight adjustment (reported; doses use the fixed-point weight curve)
+    weight_factor = _weight_factor_array(np, weights)
+
+    # Resolve each distinct strain once
+    strain_inverse, unique_strains = _factorize(np, strains)
+    table = _strain_table
+    resolutions = [_resolve(table, '' if s is None else str(s)) for s in unique_strains]
+    potency_by_strain = np.array([r.potency for r in resolutions], dtype=np.float64)
+    found_by_strain = np.array([r.found for r in resolutions], dtype=bool)
+    confidence_by_strain = np.array([r.confidence for r in resolutions], dtype=np.float64)
+    strain_potency_value = potency_by_strain[strain_inverse]
+    strain_found = found_by_strain[strain_inverse]
+    match_confidence = confidence_by_strain[strain_inverse]
+
+    potency_category_code = np.where(
+        strain_potency_value <= 6.0, 0, np.where(strain_potency_value >= 9.0, 2, 1)
+    )
+
+    unit_code, unknown = _codes(np, types, MUSHROOM_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown mushroom type: {unknown[0]}")
+    if np.isnan(weights).any():
+        raise ValueError(WEIGHT_NAN_ERROR)
+
+    # Fixed-point kernel, in int64 with the same steps as _calculate_dose
+    dose_numerators = np.array([_FIXED_DOSE_NUMERATORS[level] for level in DOSE_LEVELS], dtype=np.int64)
+    form_denominators = np.array([denominator for _, denominator in FIXED_FORM_RATIOS], dtype=np.int64)
+    coefficient = _div_round_array(
+        np,
+        dose_numerators[level_codes, unit_code] * np.rint(strain_potency_value * 1000).astype(np.int64),
+        milli(table.standard_potency) * form_denominators[unit_code]
+    )
+    segments = np.array(FIXED_WEIGHT_SEGMENTS, dtype=np.int64)
+    weight_g = np.floor(np.clip(weights, _FIXED_MIN_KG, _FIXED_MAX_KG) * 1000 + 0.5).astype(np.int64)
+    start, _, base, slope, denominator = segments[np.minimum(
+        np.searchsorted(segments[:, 1], weight_g), len(segments) - 1
+    )].T
+    dose_centigrams = _div_round_array(np, coefficient * (base + slope * (weight_g - start)), denominator * 10000)
+
     return {
-        'dose_grams': round(final_weight, 2),
-        'weight_unit': weight_unit,
-        'potency_category': potency_category,
+        'dose_grams': dose_centigrams / 100,
+        'unit_code': unit_code,
+        'potency_category_code': potency_category_code,
         'strain_found': strain_found,
-        'normalized_strain': normalized_strain or strain_input,
-        'weight_factor': round(weight_factor, 2)
+        'weight_factor': _round_array(np, weight_factor, 2),
+        'match_confidence': match_confidence
     }
 
 
+# Dose over a range of body weights; the band arrays are None unless requested
+DoseCurve = namedtuple('DoseCurve', ['weights_kg', 'dose_grams', 'min_grams', 'max_grams', 'weight_unit'])
+
+# Number of dose curves kept by dose_curve
+DOSE_CURVE_CACHE_SIZE = 256
+
+_dose_curves = OrderedDict()
+_dose_curves_lock = threading.Lock()
+
+
+def _build_dose_curve(np, mushroom_type, dose_level, strain_input, min_kg, max_kg, step_kg, bands):
+    plan = compile_plan(mushroom_type, dose_level, strain_input)
+    weights = min_kg + step_kg * np.arange(int(round((max_kg - min_kg) / step_kg)) + 1)
+    dose_grams = calculate_doses(mushroom_type, dose_level, strain_input, weights)['dose_grams']
+
+    min_grams = max_grams = None
+    if bands:
+        # Scale the weight curve by the plan's dose per dried gram of the level
+        per_gram = _weight_factor_array(np, weights) * (plan.coefficient / DOSE_LEVELS[dose_level])
+        low, high = DOSE_LEVEL_RANGES[dose_level]
+        min_grams = _round_array(np, low * per_gram, 2)
+        max_grams = _round_array(np, high * per_gram, 2)
+
+    for values in (weights, dose_grams, min_grams, max_grams):
+        if values is not None:
+            values.setflags(write=False)
+    return DoseCurve(weights, dose_grams, min_grams, max_grams, plan.weight_unit)
+
+
+def dose_curve(mushroom_type, dose_level, strain_input, min_kg=40.0, max_kg=200.0, step_kg=1.0, bands=False):
+    """
+    Calculate the dose over a range of body weights in one vectorized pass
+    Doses match calculate_dose at every weight. Curves are memoized per
+    configuration and strain table, and their arrays are read-only
+    because they are shared between callers
+    
+    Args:
+        mushroom_type: 'fresh', 'dried', or 'truffles'
+        dose_level: 'micro', 'low', 'normal', or 'high'
+        strain_input: strain name or potency category
+        min_kg, max_kg, step_kg: body weights to evaluate, inclusive
+        bands: also calculate doses for the ends of the level's
+            DOSE_LEVEL_RANGES range
+    
+    Returns:
+        DoseCurve of NumPy arrays
+    """
+    import numpy as np
+
+    table = _strain_table
+    strain_key = strain_input.lower().strip() if strain_input else ''
+    key = (table, mushroom_type, dose_level, strain_key, float(min_kg), float(max_kg), float(step_kg), bool(bands))
+    with _dose_curves_lock:
+        curve = _dose_curves.get(key)
+        if curve is not None:
+            _dose_curves.move_to_end(key)
+            return curve
+
+    curve = _build_dose_curve(np, mushroom_type, dose_level, strain_input, min_kg, max_kg, step_kg, bands)
+    with _dose_curves_lock:
+        _dose_curves[key] = curve
+        if len(_dose_curves) > DOSE_CURVE_CACHE_SIZE:
+            _dose_curves.popitem(last=False)
+    return curve
+
+
+def clear_dose_curves():
+    """Drop all memoized dose curves"""
+    with _dose_curves_lock:
+        _dose_curves.clear()
+
+
 def get_available_strains():
     """
-    Get list of all available strains in the database
+    Get all available strains in the database in sorted order
+    Returns a read-only sequence that is shared between calls
     """
-    return sorted(STRAIN_POTENCIES.keys())
+    return _strain_table.strain_names
 
 
 def get_dose_description(dose_level):
@@ -225,3 +1337,11 @@ def pounds_to_kg(pounds):
 def kg_to_pounds(kg):
     """Convert kilograms to pounds"""
     return kg * 2.20462
+
+
+# Load an external strain database if one is configured
+if os.environ.get('SHROOMIES_STRAIN_DB'):
+    watch_strain_db(
+        os.environ['SHROOMIES_STRAIN_DB'],
+        float(os.environ.get('SHROOMIES_STRAIN_DB_INTERVAL', 30))
+    )
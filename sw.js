@@ -0,0 +1,46 @@
+// Service worker for the standalone calculator
+// Serves the page, its data asset and icons from cache, so repeat visits
+// load without touching the network and the page works offline.
+// CACHE_VERSION and PRECACHE are written by build_static.py; the version
+// changes whenever the strain tables or any cached file change, which
+// installs a fresh cache and drops the old one
+const CACHE_VERSION = "95a63af305f7-7e5531bb";
+const PRECACHE = ["./", "index.html", "manifest.webmanifest", "icon.svg", "shroomies-data.json"];
+const CACHE_NAME = "shroomies-" + CACHE_VERSION;
+
+self.addEventListener("install", event => {
+  event.waitUntil(
+    caches.open(CACHE_NAME)
+      .then(cache => cache.addAll(PRECACHE.map(url => new Request(url, { cache: "reload" }))))
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener("activate", event => {
+  event.waitUntil(
+    caches.keys()
+      .then(names => Promise.all(
+        names
+          .filter(name => name.startsWith("shroomies-") && name !== CACHE_NAME)
+          .map(name => caches.delete(name))
+      ))
+      .then(() => self.clients.claim())
+  );
+});
+
+self.addEventListener("fetch", event => {
+  const request = event.request;
+  if (request.method !== "GET" || new URL(request.url).origin !== self.location.origin) return;
+
+  // Cache first; anything not precached is fetched once and kept
+  event.respondWith(
+    caches.open(CACHE_NAME).then(cache =>
+      cache.match(request, { ignoreSearch: true }).then(cached =>
+        cached || fetch(request).then(response => {
+          if (response.ok) cache.put(request, response.clone());
+          return response;
+        })
+      )
+    )
+  );
+});
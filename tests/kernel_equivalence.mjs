@@ -0,0 +1,26 @@
+// Run index.html's fixed-point dose kernel over a list of inputs
+// Takes the kernel source from index.html as it ships and its tables from
+// shroomies-data.json, reads {"rows": [[form, level, strain, weightKg], ...]}
+// on stdin and writes the dose of each row in centigrams as a JSON array.
+// tests/test_kernel_equivalence.py compares the output with the Python
+// engine; to run it by hand:
+//
+//     echo '{"rows": [["dried", "low", "gt", 70]]}' | node tests/kernel_equivalence.mjs
+import { readFileSync } from "node:fs";
+import vm from "node:vm";
+
+const ROOT = new URL("../", import.meta.url);
+const PAGE = readFileSync(new URL("index.html", ROOT), "utf8");
+const DATA = JSON.parse(readFileSync(new URL("shroomies-data.json", ROOT), "utf8"));
+
+// The kernel runs from its comment up to the grid lookup that follows it
+const start = PAGE.indexOf("// Fixed-point kernel");
+const end = PAGE.indexOf("// Precomputed dose in centigrams");
+if (start < 0 || end < start) throw new Error("Cannot find the fixed-point kernel in index.html");
+
+const context = vm.createContext({ DATA });
+vm.runInContext(PAGE.slice(start, end), context);
+
+const { rows } = JSON.parse(readFileSync(0, "utf8"));
+const doses = rows.map(([form, level, strain, weight]) => context.engineDose(form, level, strain, weight));
+process.stdout.write(JSON.stringify(doses));
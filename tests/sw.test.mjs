@@ -0,0 +1,180 @@
+// Tests for the service worker in sw.js
+// Runs the worker's install, activate and fetch handlers against in-memory
+// caches and a counting fetch, to check that repeat loads of the page make
+// no network requests and that a new cache version drops the old cache.
+//
+//     node --test tests/
+import assert from "node:assert/strict";
+import { readFileSync } from "node:fs";
+import { test } from "node:test";
+import vm from "node:vm";
+
+const ORIGIN = "https://shroomies.test";
+const SOURCE = readFileSync(new URL("../sw.js", import.meta.url), "utf8");
+const PRECACHE = JSON.parse(SOURCE.match(/^const PRECACHE = (\[.*\]);$/m)[1]);
+
+// Requests the page makes on each load: the navigation, its data asset,
+// the manifest and the icon
+const PAGE_LOAD = ["./", "shroomies-data.json", "manifest.webmanifest", "icon.svg"];
+
+function absolute(url) {
+  return new URL(url, ORIGIN + "/").href;
+}
+
+class MemoryCache {
+  constructor(network) {
+    this.network = network;
+    this.entries = new Map();
+  }
+
+  key(request, ignoreSearch) {
+    const url = new URL(typeof request === "string" ? absolute(request) : request.url);
+    if (ignoreSearch) url.search = "";
+    return url.href;
+  }
+
+  async match(request, options = {}) {
+    if (options.ignoreSearch) {
+      const wanted = this.key(request, true);
+      for (const [url, response] of this.entries) {
+        if (this.key(url, true) === wanted) return response.clone();
+      }
+      return undefined;
+    }
+    return this.entries.get(this.key(request, false))?.clone();
+  }
+
+  async put(request, response) {
+    this.entries.set(this.key(request, false), response);
+  }
+
+  async addAll(requests) {
+    for (const request of requests) {
+      const response = await this.network.fetch(request);
+      if (!response.ok) throw new TypeError(`Request for ${request.url} failed`);
+      await this.put(request, response);
+    }
+  }
+}
+
+// The browser state shared by successive workers: cache storage and network
+class Browser {
+  constructor() {
+    this.requests = [];
+    this.offline = false;
+    this.stores = new Map();
+    this.caches = {
+      open: async name => {
+        if (!this.stores.has(name)) this.stores.set(name, new MemoryCache(this));
+        return this.stores.get(name);
+      },
+      keys: async () => [...this.stores.keys()],
+      delete: async name => this.stores.delete(name)
+    };
+  }
+
+  async fetch(request) {
+    const url = typeof request === "string" ? absolute(request) : request.url;
+    this.requests.push(url);
+    if (this.offline) throw new TypeError("Failed to fetch");
+    return new Response(`body of ${url}`, { status: 200 });
+  }
+
+  // Load sw.js, optionally with another cache version, and run its
+  // install and activate handlers
+  async installWorker(version) {
+    const source = version === undefined
+      ? SOURCE
+      : SOURCE.replace(/^const CACHE_VERSION = ".*";$/m, `const CACHE_VERSION = "${version}";`);
+    const listeners = {};
+    const scope = {
+      caches: this.caches,
+      fetch: request => this.fetch(request),
+      Request: class extends Request {
+        constructor(input, init) {
+          super(typeof input === "string" ? absolute(input) : input, init);
+        }
+      },
+      URL,
+      location: new URL(ORIGIN + "/sw.js"),
+      clients: { claim: async () => {} },
+      skipWaiting: async () => {},
+      addEventListener: (type, listener) => { listeners[type] = listener; }
+    };
+    scope.self = scope;
+    vm.runInNewContext(source, scope);
+
+    for (const type of ["install", "activate"]) {
+      const pending = [];
+      listeners[type]({ waitUntil: promise => pending.push(promise) });
+      await Promise.all(pending);
+    }
+    this.worker = listeners;
+  }
+
+  // Request a URL through the worker, falling back to the network when it
+  // does not respond, as the browser does
+  async load(url) {
+    let response;
+    const request = new Request(absolute(url));
+    this.worker.fetch({ request, respondWith: promise => { response = promise; } });
+    return response === undefined ? this.fetch(request) : response;
+  }
+
+  async loadPage() {
+    return Promise.all(PAGE_LOAD.map(url => this.load(url)));
+  }
+}
+
+test("the page loads only precached files", () => {
+  for (const url of PAGE_LOAD) assert.ok(PRECACHE.includes(url), `${url} is not precached`);
+});
+
+test("install fetches each precached file once", async () => {
+  const browser = new Browser();
+  await browser.installWorker();
+  assert.deepEqual(browser.requests, PRECACHE.map(absolute));
+});
+
+test("repeat load makes zero network requests", async () => {
+  const browser = new Browser();
+  await browser.installWorker();
+  await browser.loadPage();
+  browser.requests = [];
+
+  const responses = await browser.loadPage();
+  await browser.load("index.html?lang=es");
+
+  assert.deepEqual(browser.requests, []);
+  for (const response of responses) assert.ok(response.ok);
+});
+
+test("repeat load works offline", async () => {
+  const browser = new Browser();
+  await browser.installWorker();
+  browser.offline = true;
+
+  const bodies = await Promise.all((await browser.loadPage()).map(response => response.text()));
+  assert.deepEqual(bodies, PAGE_LOAD.map(url => `body of ${absolute(url)}`));
+});
+
+test("other same-origin files are fetched once and then served from cache", async () => {
+  const browser = new Browser();
+  await browser.installWorker();
+  browser.requests = [];
+
+  await browser.load("extra.css");
+  await browser.load("extra.css");
+  assert.deepEqual(browser.requests, [absolute("extra.css")]);
+});
+
+test("a new cache version replaces the old cache", async () => {
+  const browser = new Browser();
+  await browser.installWorker("old");
+  await browser.installWorker("new");
+
+  assert.deepEqual(await browser.caches.keys(), ["shroomies-new"]);
+  browser.requests = [];
+  await browser.loadPage();
+  assert.deepEqual(browser.requests, []);
+});
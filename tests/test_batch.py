@@ -0,0 +1,82 @@
+"""
+Tests for the batch.py command line, run in-process through main()
+
+    python -m pytest tests/
+"""
+
+import csv
+import json
+
+import pytest
+
+import batch
+
+CSV_INPUT = """\
+mushroom_type,dose_level,strain,weight_kg
+dried,low,gt,70
+fresh,normal,Penis Envy,82.5
+raw,low,gt,70
+dried,huge,gt,70
+dried,low,gt,heavy
+dried,low,gt,
+"""
+
+NDJSON_INPUT = """\
+{"mushroom_type": "dried", "dose_level": "low", "strain": "gt", "weight_kg": 70}
+not json
+
+[1, 2]
+{"mushroom_type": "fresh", "dose_level": "low", "weight_kg": 60}
+{"dose_level": "low", "weight_kg": 60}
+"""
+
+
+def run(tmp_path, capsys, name, text, *args):
+    source = tmp_path / name
+    source.write_text(text, encoding='utf-8')
+    output = tmp_path / f'out-{name}'
+    assert batch.main([str(source), '-o', str(output), *args]) == 0
+    return output.read_text(encoding='utf-8'), capsys.readouterr().err
+
+
+def test_csv_rows_and_errors(tmp_path, capsys):
+    text, err = run(tmp_path, capsys, 'doses.csv', CSV_INPUT, '--workers', '1')
+    rows = list(csv.DictReader(text.splitlines()))
+    assert list(rows[0]) == ['mushroom_type', 'dose_level', 'strain', 'weight_kg', *batch.RESULT_FIELDS]
+    assert [row['dose_grams'] for row in rows[:2]] == ['0.69', '31.99']
+    assert [row['error'] for row in rows] == [
+        '', '', 'Unknown mushroom type: raw', 'Missing or unknown value: huge',
+        "could not convert string to float: 'heavy'", "could not convert string to float: ''"
+    ]
+    assert err.startswith('6 rows, 4 errors in ')
+
+
+def test_ndjson_invalid_lines(tmp_path, capsys):
+    text, err = run(tmp_path, capsys, 'doses.ndjson', NDJSON_INPUT, '--workers', '1')
+    results = [json.loads(line) for line in text.splitlines()]
+    assert len(results) == 5
+    assert results[0]['dose_grams'] == 0.69 and results[0]['error'] is None
+    assert results[1] == {batch.INVALID_LINE_FIELD: 'not json', 'error': 'Invalid JSON row'}
+    assert results[2] == {batch.INVALID_LINE_FIELD: '[1, 2]', 'error': 'Invalid JSON row'}
+    assert results[3]['strain_found'] is False and results[3]['error'] is None
+    assert results[4]['error'] == 'Missing or unknown value: mushroom_type'
+    assert err.startswith('5 rows, 3 errors in ')
+
+
+@pytest.mark.parametrize('name, input_format', [('doses.csv', 'csv'), ('doses.ndjson', 'ndjson')])
+def test_workers_keep_input_order(tmp_path, capsys, name, input_format):
+    weights = [40 + (i * 37) % 160 for i in range(50)]
+    if input_format == 'csv':
+        text = 'mushroom_type,dose_level,strain,weight_kg\n' + ''.join(f'dried,normal,gt,{w}\n' for w in weights)
+    else:
+        text = ''.join(json.dumps({'mushroom_type': 'dried', 'dose_level': 'normal', 'strain': 'gt',
+                                   'weight_kg': w}) + '\n' for w in weights)
+    serial, _ = run(tmp_path, capsys, name, text, '--workers', '1')
+    parallel, err = run(tmp_path, capsys, name, text, '--workers', '2', '--chunk-size', '7')
+    assert parallel == serial
+    lines = serial.splitlines()
+    if input_format == 'csv':
+        assert [float(row['weight_kg']) for row in csv.DictReader(lines)] == weights
+    else:
+        assert [json.loads(line)['weight_kg'] for line in lines] == weights
+    assert err.startswith('50 rows, 0 errors in ')
@@ -0,0 +1,100 @@
+"""
+Equivalence of the fixed-point dose kernel across its implementations
+calculate_dose, calculate_doses, DosePlan.evaluate and index.html's kernel
+must agree bit for bit over every strain, alias and potency category, and
+each must be the float formula (float_dose) rounded to 0.01 except within
+float error of a rounding tie
+
+    python -m pytest tests/
+"""
+
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from build_static import EQUIVALENCE_SLACK_CG, build_tables
+from shroomies import (
+    DOSE_LEVELS,
+    MUSHROOM_TYPES,
+    calculate_dose,
+    calculate_doses,
+    compile_plan,
+    float_dose,
+    get_strain_table,
+    pounds_to_kg
+)
+
+NODE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kernel_equivalence.mjs')
+
+# The app's kg and lbs input steps, both ends and the knees of the weight
+# curve, weights outside it and weights half a gram from a whole gram
+WEIGHTS = [
+    *(kg / 2 for kg in range(40, 401)),
+    *pounds_to_kg(np.arange(44.0, 441.0)).tolist(),
+    0.0, 10.0, 79.9995, 80.0005, 114.9995, 249.9995, 250.0005, 399.9995, 400.0, 450.0, 1000.0
+]
+
+
+def strain_inputs():
+    """Every strain name, alias and potency category, and a few typed loosely"""
+    table = get_strain_table()
+    names = [*table.strain_potencies, *table.aliases, *table.potency_categories]
+    return [*names, *(f'  {name.title()} ' for name in names[::10])]
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return [
+        (mushroom_type, dose_level, strain, weight)
+        for mushroom_type in MUSHROOM_TYPES
+        for dose_level in DOSE_LEVELS
+        for strain in strain_inputs()
+        for weight in WEIGHTS
+    ]
+
+
+@pytest.fixture(scope='module')
+def doses(rows):
+    return [calculate_dose(*row).dose_grams for row in rows]
+
+
+def test_calculate_doses_matches_calculate_dose(rows, doses):
+    columns = [np.array(column) for column in zip(*rows)]
+    assert calculate_doses(*columns)['dose_grams'].tolist() == doses
+
+
+def test_dose_plan_matches_calculate_dose(rows, doses):
+    plans = {}
+    for (mushroom_type, dose_level, strain, weight), dose in zip(rows, doses):
+        key = mushroom_type, dose_level, strain
+        if key not in plans:
+            plans[key] = compile_plan(*key)
+        assert plans[key].evaluate(weight) == dose, (key, weight)
+
+
+def test_kernel_rounds_float_formula(rows, doses):
+    for row, dose in zip(rows, doses):
+        exact = float_dose(*row) * 100
+        if round(dose * 100) != round(exact):
+            # Only allowed where the float dose sits on a rounding tie
+            assert abs(abs(dose * 100 - exact) - 0.5) <= EQUIVALENCE_SLACK_CG, (row, dose, exact / 100)
+
+
+def test_exported_tables_match_engine():
+    with open(os.path.join(os.path.dirname(NODE_SCRIPT), os.pardir, 'shroomies-data.json')) as f:
+        exported = json.load(f)
+    tables = build_tables()
+    assert {key: exported[key] for key in tables} == json.loads(json.dumps(tables))
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs Node.js')
+def test_index_html_kernel_matches_calculate_dose(rows, doses):
+    output = subprocess.run(
+        ['node', NODE_SCRIPT], input=json.dumps({'rows': rows}), capture_output=True, text=True, check=True
+    ).stdout
+    centigrams = json.loads(output)
+    assert [value / 100 for value in centigrams] == doses
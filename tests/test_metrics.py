@@ -0,0 +1,55 @@
+"""
+Tests for the Prometheus metrics
+
+    python -m pytest tests/
+"""
+
+import math
+import threading
+
+import pytest
+
+import metrics
+import shroomies
+
+
+@pytest.fixture
+def observed():
+    metrics.enable()
+    yield
+    metrics.disable()
+
+
+@pytest.mark.parametrize('args, outcome', [
+    (('dried', 'low', 'gt', 70), 'ok'),
+    (('dried', 'huge', 'gt', 70), 'unknown_dose_level'),
+    (('raw', 'low', 'gt', 70), 'unknown_mushroom_type'),
+    (('dried', 'low', 'gt', math.nan), 'invalid_weight'),
+    (('dried', 'low', 42, 70), 'error'),
+])
+def test_each_call_counts_under_one_outcome(observed, args, outcome):
+    before = {name: metrics.CALCULATIONS.value(name) for name in
+              ('ok', 'unknown_dose_level', 'unknown_mushroom_type', 'invalid_weight', 'error')}
+    try:
+        shroomies.calculate_dose(*args)
+    except Exception:
+        pass
+    after = {name: metrics.CALCULATIONS.value(name) for name in before}
+    assert {name: after[name] - before[name] for name in before} == {
+        name: int(name == outcome) for name in before
+    }
+
+
+def test_exited_threads_fold_into_the_total():
+    counter = metrics.Counter('test_total', 'Test counter')
+
+    def work():
+        for _ in range(10):
+            counter.inc()
+
+    for _ in range(50):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    assert counter.value() == 500
+    assert len(counter._shards) <= 1
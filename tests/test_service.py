@@ -0,0 +1,128 @@
+"""
+Tests for the headless JSON API, driven in-process with service.call()
+
+    python -m pytest tests/
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import service
+
+GOOD_REQUEST = {'mushroom_type': 'dried', 'dose_level': 'low', 'strain': 'gt', 'weight_kg': 70}
+
+
+def post(path, body):
+    status, headers, response = service.call('POST', path, body)
+    return status, dict(headers)[b'content-type'], response
+
+
+def ndjson(body):
+    return [json.loads(line) for line in body.decode('utf-8').splitlines()]
+
+
+def test_dose():
+    status, content_type, body = post('/dose', GOOD_REQUEST)
+    assert (status, content_type) == (200, b'application/json')
+    result = json.loads(body)
+    assert result['dose_grams'] == 0.69
+    assert result['normalized_strain'] == 'golden teacher'
+    assert result['strain_found'] is True
+
+
+@pytest.mark.parametrize('body, error', [
+    (b'{not json', 'Invalid JSON'),
+    ([GOOD_REQUEST], 'Request must be an object'),
+    ({'dose_level': 'low', 'weight_kg': 70}, 'Missing or unknown value: mushroom_type'),
+    ({**GOOD_REQUEST, 'dose_level': 'huge'}, 'Missing or unknown value: huge'),
+    ({**GOOD_REQUEST, 'mushroom_type': 'raw'}, 'Unknown mushroom type: raw'),
+    ({**GOOD_REQUEST, 'weight_kg': 'heavy'}, "could not convert string to float: 'heavy'"),
+    ({**GOOD_REQUEST, 'weight_kg': 'NaN'}, 'weight_kg must be a number'),
+])
+def test_dose_rejects_bad_input(body, error):
+    status, _, response = post('/dose', body)
+    assert status == 400
+    assert json.loads(response) == {'error': error}
+
+
+def test_batch_json_array_keeps_order():
+    weights = [60, 200, 90, 45, 130]
+    status, content_type, body = post('/dose/batch', [{**GOOD_REQUEST, 'weight_kg': w} for w in weights])
+    assert (status, content_type) == (200, b'application/x-ndjson')
+    expected = [json.loads(post('/dose', {**GOOD_REQUEST, 'weight_kg': w})[2]) for w in weights]
+    assert ndjson(body) == expected
+
+
+def test_batch_ndjson_with_bad_items():
+    lines = [json.dumps(GOOD_REQUEST), '', json.dumps([1, 2]), json.dumps({**GOOD_REQUEST, 'mushroom_type': 'raw'})]
+    status, _, body = post('/dose/batch', '\n'.join(lines).encode('utf-8'))
+    assert status == 200
+    results = ndjson(body)
+    assert len(results) == 3
+    assert results[0]['dose_grams'] == 0.69
+    assert results[1] == {'error': 'Request must be an object'}
+    assert results[2] == {'error': 'Unknown mushroom type: raw'}
+
+
+def test_batch_spans_several_chunks():
+    count = service.BATCH_CHUNK_LINES * 2 + 3
+    status, _, body = post('/dose/batch', [{**GOOD_REQUEST, 'weight_kg': 40 + i % 100} for i in range(count)])
+    assert status == 200
+    results = ndjson(body)
+    assert len(results) == count
+    assert [r['dose_grams'] for r in results[:100]] == [r['dose_grams'] for r in results[100:200]]
+
+
+def test_batch_rejects_invalid_json():
+    status, _, body = post('/dose/batch', b'[{"mushroom_type": ')
+    assert status == 400
+    assert json.loads(body) == {'error': 'Invalid JSON'}
+
+
+def test_strains_and_completion():
+    status, _, body = service.call('GET', '/strains')
+    assert status == 200
+    assert 'golden teacher' in json.loads(body)['strains']
+    status, _, body = service.call('GET', '/strains/complete', query_string=b'prefix=gold&limit=2')
+    assert status == 200
+    assert json.loads(body) == {'prefix': 'gold', 'strains': ['golden mammoth', 'golden teacher']}
+    status, _, body = service.call('GET', '/strains/complete', query_string=b'limit=many')
+    assert status == 400
+
+
+@pytest.mark.parametrize('method, path, status', [
+    ('GET', '/nowhere', 404),
+    ('POST', '/nowhere', 404),
+    ('GET', '/dose', 405),
+    ('GET', '/dose/batch', 405),
+    ('POST', '/strains', 405),
+    ('DELETE', '/metrics', 405),
+])
+def test_unknown_paths_and_methods(method, path, status):
+    assert service.call(method, path)[0] == status
+
+
+def test_websocket_is_rejected():
+    sent = []
+
+    async def receive():
+        return {'type': 'websocket.connect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(service.app({'type': 'websocket', 'path': '/dose'}, receive, send))
+    assert sent == [{'type': 'websocket.close'}]
+
+
+def test_unknown_scope_type_is_rejected():
+    async def receive():
+        return {}
+
+    async def send(message):
+        raise AssertionError('nothing should be sent')
+
+    with pytest.raises(ValueError, match='Unsupported ASGI scope type'):
+        asyncio.run(service.app({'type': 'other'}, receive, send))
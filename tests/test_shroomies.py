@@ -0,0 +1,92 @@
+"""
+Tests for the shroomies engine's result type, dose cache and input checks
+
+    python -m pytest tests/
+"""
+
+import math
+import pickle
+
+import pytest
+
+from shroomies import (
+    DOSE_RESULT_KEYS,
+    WEIGHT_NAN_ERROR,
+    DoseResult,
+    calculate_dose,
+    calculate_doses,
+    compile_plan,
+    disable_dose_cache,
+    dose_cache_info,
+    enable_dose_cache
+)
+
+
+def test_dose_result_reads_like_a_dict():
+    result = calculate_dose('dried', 'low', 'gt', 70)
+    assert list(result) == list(DOSE_RESULT_KEYS)
+    assert len(result) == len(DOSE_RESULT_KEYS)
+    assert result == result.as_dict() == dict(result)
+    assert result['weight_unit'] == 'grams dried'
+    assert result.get('missing', 'default') == 'default'
+    assert 'dose_grams' in result and 'unit_code' not in result
+    with pytest.raises(KeyError):
+        result[0]
+
+
+def test_dose_result_is_immutable():
+    result = calculate_dose('dried', 'low', 'gt', 70)
+    with pytest.raises(AttributeError):
+        result.dose_grams = 99
+    with pytest.raises(AttributeError):
+        result.extra = 1
+    with pytest.raises(AttributeError):
+        del result.normalized_strain
+    assert result.dose_grams == 0.69
+
+
+def test_dose_result_pickles_by_value():
+    result = calculate_dose('fresh', 'normal', 'Penis Envy', 82.5)
+    copy = pickle.loads(pickle.dumps(result))
+    assert isinstance(copy, DoseResult)
+    assert copy == result
+    assert repr(copy) == repr(result)
+
+
+@pytest.fixture
+def dose_cache():
+    enable_dose_cache(maxsize=16)
+    yield
+    disable_dose_cache()
+
+
+def test_cached_results_cannot_be_corrupted(dose_cache):
+    first = calculate_dose('dried', 'low', 'gt', 70)
+    with pytest.raises(AttributeError):
+        first.dose_grams = 99
+    again = calculate_dose('dried', 'low', 'GT', 70)
+    assert dose_cache_info().hits == 1
+    assert again is first
+    assert again.dose_grams == 0.69
+    assert again.as_dict() == {
+        'dose_grams': 0.69, 'weight_unit': 'grams dried', 'potency_category': 'mild', 'strain_found': True,
+        'normalized_strain': 'golden teacher', 'weight_factor': 0.8, 'match_confidence': 1.0
+    }
+
+
+def test_nan_weight_is_rejected():
+    with pytest.raises(ValueError, match=WEIGHT_NAN_ERROR):
+        calculate_dose('dried', 'low', 'gt', math.nan)
+    with pytest.raises(ValueError, match=WEIGHT_NAN_ERROR):
+        compile_plan('dried', 'low', 'gt').evaluate(math.nan)
+    with pytest.raises(ValueError, match=WEIGHT_NAN_ERROR):
+        calculate_doses('dried', 'low', 'gt', [70.0, math.nan])
+
+
+def test_nan_weight_is_rejected_by_the_cache():
+    enable_dose_cache(weight_step=1.0)
+    try:
+        with pytest.raises(ValueError, match=WEIGHT_NAN_ERROR):
+            calculate_dose('dried', 'low', 'gt', math.nan)
+    finally:
+        disable_dose_cache()